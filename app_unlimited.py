@@ -19,8 +19,11 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 # Import scraper functions
-from gmaps_scraper import scrape_all, save_to_csv
+from gmaps_scraper import METRICS, BackgroundScrape, ResultStore, pyarrow, record_key
+import shutil
+import tempfile
 import time
+import uuid
 from datetime import datetime
 
 # ============================================================================
@@ -109,6 +112,37 @@ if 'scraping' not in st.session_state:
     st.session_state.scraping = False
 if 'logs' not in st.session_state:
     st.session_state.logs = []
+if 'metrics' not in st.session_state:
+    st.session_state.metrics = None
+if 'job' not in st.session_state:
+    st.session_state.job = None
+if 'job_status' not in st.session_state:
+    st.session_state.job_status = {}
+if 'run_id' not in st.session_state:
+    st.session_state.run_id = None
+if 'results_version' not in st.session_state:
+    st.session_state.results_version = 0
+if 'store' not in st.session_state:
+    st.session_state.store = None
+if 'positions' not in st.session_state:
+    st.session_state.positions = {}
+if 'last_refresh' not in st.session_state:
+    st.session_state.last_refresh = 0.0
+if 'refresh_pending' not in st.session_state:
+    st.session_state.refresh_pending = False
+
+# Seconds between full-page refreshes while a run adds rows, so the results
+# table stays live without rebuilding it every tick
+RESULTS_REFRESH_EVERY = 5.0
+
+def drop_store():
+    """Close the current run's result store and delete its folder"""
+    
+    store = st.session_state.store
+    if store is not None:
+        store.close()
+        shutil.rmtree(os.path.dirname(store.path), ignore_errors=True)
+        st.session_state.store = None
 
 # ============================================================================
 # HEADER
@@ -134,12 +168,37 @@ with st.sidebar:
         help="NO LIMITS! Scrape as many as you want (100-10000 recommended)"
     )
     
+    maps_tabs = st.number_input(
+        "Parallel Maps tabs",
+        min_value=1,
+        max_value=16,
+        value=1,
+        step=1,
+        help="Scrape several queries at the same time (uses more CPU & RAM)"
+    )
+    
     extract_contacts = st.checkbox(
         "Extract emails & social media",
         value=True,
         help="Visit websites to find contact information"
     )
     
+    contact_workers = st.number_input(
+        "Parallel website workers",
+        min_value=1,
+        max_value=32,
+        value=3,
+        step=1,
+        disabled=not extract_contacts,
+        help="Browser pages visiting business websites (JavaScript-heavy sites only when aiohttp is installed)"
+    )
+    
+    adaptive = st.checkbox(
+        "Adaptive concurrency",
+        value=False,
+        help="Treat the tab and worker counts above as maximums and use as many as stay fast"
+    )
+    
     st.markdown("---")
     
     st.markdown("### 📊 What You'll Get")
@@ -208,13 +267,38 @@ with col2:
     start_disabled = len(queries) == 0 or st.session_state.scraping
     
     if st.button("▶️ START SCRAPING", disabled=start_disabled, type="primary"):
+        # The scrape runs in a background thread - this page only polls it
+        st.session_state.job = BackgroundScrape(
+            queries,
+            max_results_per_query=max_results,
+            extract_contacts=extract_contacts,
+            maps_tabs=maps_tabs,
+            contact_workers=contact_workers,
+            adaptive=adaptive,
+        ).start()
+        st.session_state.job_status = {'queries_done': 0, 'total': len(queries), 'phase': 'maps',
+                                       'started': time.time(), 'error': None, 'cancelled': False}
+        st.session_state.results = []
+        st.session_state.positions = {}
+        st.session_state.run_id = uuid.uuid4().hex
+        # Downloads are exported from here instead of the DataFrame
+        drop_store()
+        st.session_state.store = ResultStore(
+            os.path.join(tempfile.mkdtemp(prefix='gmaps_'), 'results.sqlite3'))
+        st.session_state.metrics = None
         st.session_state.scraping = True
         st.session_state.logs = []
         st.rerun()
     
-    if st.session_state.results is not None:
+    if st.session_state.scraping:
+        if st.button("⏹️ CANCEL"):
+            # Businesses still waiting for their contacts are kept as they are
+            st.session_state.job.cancel()
+    
+    if st.session_state.results and not st.session_state.scraping:
         if st.button("🗑️ Clear Results"):
             st.session_state.results = None
+            drop_store()
             st.session_state.logs = []
             st.rerun()
     
@@ -223,64 +307,135 @@ with col2:
     if st.session_state.scraping:
         st.markdown("### 🔄 Status")
         st.markdown("**SCRAPING...**")
-        st.spinner("Processing...")
 
 # ============================================================================
 # SCRAPING LOGIC
 # ============================================================================
 
+@st.fragment(run_every=1.0)
+def live_progress():
+    """Drain the background run's events every second and show where it is"""
+    
+    job = st.session_state.job
+    status = st.session_state.job_status
+    if job is None:
+        return
+    
+    finished = False
+    for kind, payload in job.poll():
+        if kind == 'records':
+            st.session_state.refresh_pending = True
+            for row in payload:
+                st.session_state.positions[record_key(row)] = len(st.session_state.results)
+                st.session_state.results.append(row)
+            st.session_state.store.write_many(payload)
+        elif kind == 'queries':
+            # Later queries found businesses that were already listed
+            for key, queries in payload.items():
+                position = st.session_state.positions.get(key)
+                if position is None:
+                    # Not sent yet - it will arrive with all of its queries
+                    continue
+                st.session_state.results[position]['queries'] = queries
+                st.session_state.store.write(st.session_state.results[position])
+            st.session_state.results_version += 1
+            st.session_state.refresh_pending = True
+        elif kind == 'progress':
+            if payload['type'] == 'query_done':
+                status['queries_done'] = payload['done']
+                status['total'] = payload['total']
+            elif payload['type'] == 'phase':
+                status['phase'] = payload['phase']
+        elif kind == 'error':
+            status['error'] = payload
+        elif kind == 'done':
+            status['cancelled'] = payload['cancelled']
+            status['elapsed'] = payload['elapsed']
+            finished = True
+    
+    total = max(status['total'], 1)
+    elapsed = time.time() - status['started']
+    st.progress(min(status['queries_done'] / total, 1.0))
+    phase = "finishing emails & socials" if status['phase'] == 'contacts' else "scraping Google Maps"
+    st.markdown(f"🔄 **{status['queries_done']}/{status['total']} queries done** - {phase} | "
+                f"**{len(st.session_state.results)}** businesses so far | {elapsed//60:.0f}m {elapsed%60:.0f}s")
+    
+    if st.session_state.results:
+        st.dataframe(pd.DataFrame(st.session_state.results[-10:]), use_container_width=True, hide_index=True)
+    
+    if finished:
+        # Show the full results view
+        st.session_state.job = None
+        st.session_state.scraping = False
+        st.session_state.store.commit()
+        st.session_state.metrics = METRICS.snapshot()
+        st.rerun()
+    elif (st.session_state.refresh_pending
+          and time.time() - st.session_state.last_refresh >= RESULTS_REFRESH_EVERY):
+        # New rows - redraw the results table below as well
+        st.session_state.refresh_pending = False
+        st.session_state.last_refresh = time.time()
+        st.rerun(scope="app")
+
 if st.session_state.scraping:
     st.markdown("---")
     st.header("📋 Live Progress")
-    
-    progress_container = st.container()
-    log_container = st.empty()
-    
-    with progress_container:
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-    
-    try:
-        # Run scraper
-        status_text.markdown("🚀 **Initializing scraper...**")
-        
-        start_time = time.time()
-        results = asyncio.run(scrape_all(queries, max_results, extract_contacts))
-        
-        # Store results
-        st.session_state.results = results
-        st.session_state.scraping = False
-        
-        elapsed = time.time() - start_time
-        
-        progress_bar.progress(100)
-        status_text.markdown(f"✅ **Complete!** ({elapsed//60:.0f}m {elapsed%60:.0f}s)")
-        
-        st.success("🎉 Scraping finished successfully!")
-        time.sleep(2)
-        st.rerun()
-        
-    except Exception as e:
-        st.error(f"❌ Error: {str(e)}")
-        st.session_state.scraping = False
-        st.button("Try Again")
+    st.caption(f"Results below refresh every {RESULTS_REFRESH_EVERY:.0f}s while new rows arrive - you can export while the scrape runs")
+    live_progress()
+
+status = st.session_state.job_status
+if not st.session_state.scraping and status.get('error'):
+    st.error(f"❌ Error: {status['error']}")
+elif not st.session_state.scraping and status.get('cancelled'):
+    st.warning(f"⏹️ Cancelled - kept the {len(st.session_state.results or [])} businesses scraped so far")
 
 # ============================================================================
 # RESULTS DISPLAY
 # ============================================================================
 
-if st.session_state.results is not None and not st.session_state.scraping:
+# Fields with a metric card and/or a filter checkbox
+HAS_FIELDS = ['phone', 'email', 'instagram', 'facebook']
+
+# cache_resource hands back the same objects instead of unpickling a copy on
+# every rerun - nothing below modifies them. A new run id, more rows from a
+# live run or updated rows (results_version) is a new cache entry.
+@st.cache_resource(max_entries=4, show_spinner=False)
+def results_table(run_id, rows, version, _records):
+    """
+    Build the results DataFrame once per result set, along with what every
+    rerun needs from it: a boolean "has <field>" column per HAS_FIELDS, one
+    lowercase search string per row and the fill-rate counts.
+    """
+    
+    df = pd.DataFrame(_records[:rows])
+    text = df.fillna('').astype(str)
+    
+    has = pd.DataFrame({field: text[field].str.strip().ne('') if field in text else False
+                        for field in HAS_FIELDS}, index=df.index)
+    
+    # Every column of a row joined by a separator no search term can span
+    search = pd.Series(['\x1f'.join(row).lower() for row in text.itertuples(index=False, name=None)],
+                       index=df.index, dtype=object)
+    
+    counts = has.sum().to_dict()
+    return df, has, search, counts
+
+EXPORT_MIME_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson', 'parquet': 'application/vnd.apache.parquet'}
+
+if st.session_state.results:
     st.markdown("---")
     
     # Success banner
-    st.markdown(f"""
-    <div class='success-banner'>
-        🎉 SUCCESS! Scraped {len(st.session_state.results)} businesses with full contact data!
-    </div>
-    """, unsafe_allow_html=True)
+    if not st.session_state.scraping:
+        st.markdown(f"""
+        <div class='success-banner'>
+            🎉 SUCCESS! Scraped {len(st.session_state.results)} businesses with full contact data!
+        </div>
+        """, unsafe_allow_html=True)
     
-    # Convert to DataFrame
-    df = pd.DataFrame(st.session_state.results)
+    # Built once per result set, not on every filter click
+    df, has, search, counts = results_table(st.session_state.run_id, len(st.session_state.results),
+                                            st.session_state.results_version, st.session_state.results)
     
     # Statistics Cards
     st.header("📊 Results Overview")
@@ -299,7 +454,7 @@ if st.session_state.results is not None and not st.session_state.scraping:
         """, unsafe_allow_html=True)
     
     with col2:
-        phone_count = df['phone'].astype(str).str.strip().ne('').sum()
+        phone_count = counts['phone']
         phone_pct = int(phone_count * 100 / total) if total > 0 else 0
         st.markdown(f"""
         <div class='metric-card' style='background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);'>
@@ -310,7 +465,7 @@ if st.session_state.results is not None and not st.session_state.scraping:
         """, unsafe_allow_html=True)
     
     with col3:
-        email_count = df['email'].astype(str).str.strip().ne('').sum()
+        email_count = counts['email']
         email_pct = int(email_count * 100 / total) if total > 0 else 0
         st.markdown(f"""
         <div class='metric-card' style='background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);'>
@@ -321,7 +476,7 @@ if st.session_state.results is not None and not st.session_state.scraping:
         """, unsafe_allow_html=True)
     
     with col4:
-        instagram_count = df['instagram'].astype(str).str.strip().ne('').sum()
+        instagram_count = counts['instagram']
         instagram_pct = int(instagram_count * 100 / total) if total > 0 else 0
         st.markdown(f"""
         <div class='metric-card' style='background: linear-gradient(135deg, #fa709a 0%, #fee140 100%);'>
@@ -332,7 +487,7 @@ if st.session_state.results is not None and not st.session_state.scraping:
         """, unsafe_allow_html=True)
     
     with col5:
-        facebook_count = df['facebook'].astype(str).str.strip().ne('').sum()
+        facebook_count = counts['facebook']
         facebook_pct = int(facebook_count * 100 / total) if total > 0 else 0
         st.markdown(f"""
         <div class='metric-card' style='background: linear-gradient(135deg, #30cfd0 0%, #330867 100%);'>
@@ -347,24 +502,29 @@ if st.session_state.results is not None and not st.session_state.scraping:
     # Download Section
     st.header("💾 Download Your Data")
     
-    col1, col2 = st.columns([2, 1])
+    col1, col2, col3 = st.columns([2, 1, 1])
+    
+    with col3:
+        formats = ['csv', 'jsonl'] + (['parquet'] if pyarrow is not None else [])
+        fmt = st.selectbox("Format", formats, format_func=str.upper)
     
     with col1:
-        # Generate CSV
-        csv = df.to_csv(index=False).encode('utf-8')
+        # Streamed from the result store - only re-exported when new rows came in
+        path = st.session_state.store.export(fmt)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"gmaps_results_{timestamp}.csv"
+        filename = f"gmaps_results_{timestamp}.{fmt}"
         
-        st.download_button(
-            label="⬇️ DOWNLOAD CSV",
-            data=csv,
-            file_name=filename,
-            mime='text/csv',
-            use_container_width=True
-        )
+        with open(path, 'rb') as f:
+            st.download_button(
+                label=f"⬇️ DOWNLOAD {fmt.upper()}",
+                data=f,
+                file_name=filename,
+                mime=EXPORT_MIME_TYPES[fmt],
+                use_container_width=True
+            )
     
     with col2:
-        st.metric("File Size", f"{len(csv) / 1024:.1f} KB")
+        st.metric("File Size", f"{os.path.getsize(path) / 1024:.1f} KB")
     
     # Data Table
     st.markdown("---")
@@ -382,21 +542,22 @@ if st.session_state.results is not None and not st.session_state.scraping:
     with col4:
         search_term = st.text_input("🔍 Search", "")
     
-    # Apply filters
-    filtered_df = df.copy()
+    # Apply filters - one boolean mask over the precomputed columns
+    mask = pd.Series(True, index=df.index)
     
     if filter_email:
-        filtered_df = filtered_df[filtered_df['email'].astype(str).str.strip().ne('')]
+        mask &= has['email']
     
     if filter_instagram:
-        filtered_df = filtered_df[filtered_df['instagram'].astype(str).str.strip().ne('')]
+        mask &= has['instagram']
     
     if filter_facebook:
-        filtered_df = filtered_df[filtered_df['facebook'].astype(str).str.strip().ne('')]
+        mask &= has['facebook']
     
     if search_term:
-        mask = filtered_df.astype(str).apply(lambda x: x.str.contains(search_term, case=False, na=False)).any(axis=1)
-        filtered_df = filtered_df[mask]
+        mask &= search.str.contains(search_term.strip().lower(), regex=False)
+    
+    filtered_df = df[mask]
     
     # Display table
     st.dataframe(
@@ -414,6 +575,23 @@ if st.session_state.results is not None and not st.session_state.scraping:
     )
     
     st.info(f"📊 Showing **{len(filtered_df)}** of **{len(df)}** results")
+    
+    # Where the time went
+    metrics = st.session_state.metrics
+    if metrics and metrics['stages']:
+        with st.expander("⏱️ Performance by stage"):
+            stages_df = pd.DataFrame([
+                {'Stage': stage, 'Count': data['count'], 'Total (s)': data['sum'],
+                 'Avg (s)': data['avg'], 'p50 ≤ (s)': data['p50'], 'p95 ≤ (s)': data['p95']}
+                for stage, data in metrics['stages'].items()
+            ]).sort_values('Total (s)', ascending=False)
+            st.dataframe(stages_df, use_container_width=True, hide_index=True)
+            
+            if metrics['counters']:
+                st.json(metrics['counters'])
+            if metrics['errors']:
+                st.markdown("**Errors**")
+                st.dataframe(pd.DataFrame(metrics['errors']), use_container_width=True, hide_index=True)
 
 # ============================================================================
 # FOOTER
@@ -0,0 +1,103 @@
+"""
+Extraction micro-benchmark
+Checks that scan_contacts() gives the same results as extract_emails(),
+extract_socials() and extract_phone() on a fixture corpus, then times both
+on synthetic 1-5 MB pages.
+
+    python benchmarks/extraction_bench.py [--sizes 1 2 5] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gmaps_scraper import extract_emails, extract_phone, extract_socials, scan_contacts
+
+# Hand-picked cases for the edges of the patterns
+FIXTURES = [
+    '',
+    'no contacts here at all',
+    'Email us: info@barbershop.co.uk or bookings@barbershop.co.uk',
+    'Tracking: 1234@sentry.wixpress.com, ok@real-shop.com, x@Schema.org',
+    'a@b@c.com d@e.f.gh joe@@mail.com @start.com end@',
+    'weird|tld@shop.c|m and name.surname+tag@sub.domain.io',
+    'café@shop.com and naïve.user@mail.com',
+    '<a href="https://www.instagram.com/the_barber.shop/">IG</a>',
+    '<a href="http://facebook.com/TheBarber.Shop">FB</a> facebook.com/ facebook.com/second',
+    'twitter.com/first_handle then x.com/second and netflix.com/browse',
+    'https://www.tiktok.com/@cutz.daily tiktok.com/nohandle',
+    'linkedin.com/company/barber-co linkedin.com/in/jane-doe linkedin.com/school/x',
+    'youtube.com/channel/UCabc123 youtube.com/@cutz youtube.com/user/old_user youtube.com/watch?v=1',
+    'Call +44 20 7946 0958 or (020) 7946-0958 today',
+    'Opening 09:00-17:00, ref 1234567890123, tel: 01702.123.456',
+]
+
+WORDS = ['barber', 'fade', 'appointment', 'London', 'price', 'beard', 'trim', 'gift', 'card', 'opening']
+
+def synthetic_page(size_bytes, seed):
+    """HTML-ish page of about size_bytes with contacts scattered through it"""
+
+    rng = random.Random(seed)
+    chunks = ['<html><head><script>var cfg={"dsn":"https://abc123@o1.ingest.sentry.io/42"};</script></head><body>']
+    length = len(chunks[0])
+    while length < size_bytes:
+        roll = rng.random()
+        if roll < 0.002:
+            chunk = f'<a href="mailto:{rng.choice(WORDS)}{rng.randint(1, 99)}@example{rng.randint(1, 9)}.com">mail</a>'
+        elif roll < 0.003:
+            chunk = f'<a href="https://www.{rng.choice(["instagram", "facebook", "twitter", "tiktok"])}.com/{"@" if rng.random() < 0.5 else ""}{rng.choice(WORDS)}_{rng.randint(1, 999)}">s</a>'
+        elif roll < 0.004:
+            chunk = f'<p>Tel: +44 {rng.randint(10, 99)} {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}</p>'
+        elif roll < 0.05:
+            chunk = f'<img src="/assets/{rng.randint(1, 10**6)}@2x.png" alt="{rng.choice(WORDS)}">'
+        elif roll < 0.2:
+            chunk = f'<div class="c{rng.randint(1, 500)}" data-id="{rng.randint(1, 10**9)}">'
+        else:
+            chunk = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 15))) + '. '
+        chunks.append(chunk)
+        length += len(chunk)
+    chunks.append('<footer>linkedin.com/company/acme youtube.com/@acme</footer></body></html>')
+    return ''.join(chunks)
+
+def original(text):
+    return set(extract_emails(text)), extract_socials(text), extract_phone(text)
+
+def scanned(text):
+    result = scan_contacts(text, phone=True)
+    return set(result.emails), result.socials, result.phone
+
+def best_time(func, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark scan_contacts against the per-field extractors')
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 2, 5], help='Page sizes in MB')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing runs per page (best is reported)')
+    args = parser.parse_args()
+
+    pages = [synthetic_page(int(mb * 1024 * 1024), seed) for seed, mb in enumerate(args.sizes)]
+
+    # Same output first - a fast scanner that disagrees is useless
+    mismatches = 0
+    for text in FIXTURES + pages:
+        if original(text) != scanned(text):
+            mismatches += 1
+            print(f"❌ Mismatch on: {text[:80]!r}")
+    print(f"✅ {len(FIXTURES) + len(pages) - mismatches}/{len(FIXTURES) + len(pages)} corpus pages match")
+
+    print(f"\n{'Page':>8} {'original':>10} {'scan':>10} {'speedup':>8}")
+    for mb, text in zip(args.sizes, pages):
+        before = best_time(original, text, args.repeat)
+        after = best_time(scanned, text, args.repeat)
+        print(f"{mb:>6.1f}MB {before*1000:>8.1f}ms {after*1000:>8.1f}ms {before/after:>7.1f}x")
+
+    sys.exit(1 if mismatches else 0)
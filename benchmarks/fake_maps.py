@@ -0,0 +1,188 @@
+"""
+Local stand-in for Google Maps and the business websites it links to, for
+benchmarking the scraper offline.
+
+    /maps/search/<query>   feed of [role="article"] cards that lazy-load on scroll;
+                           clicking a card fills the detail pane
+    /site/<n>/             homepage of business n (some have the email on it)
+    /site/<n>/contact      its contact page (the rest have the email here)
+
+Latencies are in milliseconds: scroll and detail are simulated in the page's
+JavaScript, site is a server-side delay per website request.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEARCH_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Fake Maps</title>
+<style>
+  body { margin: 0; display: flex; font-family: sans-serif; }
+  [role="feed"] { width: 400px; height: 800px; overflow-y: auto; }
+  [role="article"] { height: 90px; border-bottom: 1px solid #ddd; cursor: pointer; }
+  [role="main"] { flex: 1; padding: 16px; }
+</style></head>
+<body>
+<div role="feed" aria-label="Results"></div>
+<div role="main"><h1></h1><div id="pane"></div></div>
+<script>
+const CONFIG = __CONFIG__;
+const feed = document.querySelector('[role="feed"]');
+const pane = document.getElementById('pane');
+const h1 = document.querySelector('h1');
+let loaded = 0;
+let loading = false;
+
+function business(n) {
+  return {
+    name: `Bench Business ${n}`,
+    phone: `+44 20 7946 ${String(n % 10000).padStart(4, '0')}`,
+    website: `${CONFIG.siteBase}/site/${n}/`,
+    address: `${n} High Street, London`,
+    rating: (3 + (n % 20) / 10).toFixed(1),
+    reviews: 10 + n * 7,
+    category: ['Barber shop', 'Restaurant', 'Plumber', 'Cafe'][n % 4],
+  };
+}
+
+function addCards() {
+  const end = Math.min(loaded + CONFIG.batch, CONFIG.cards);
+  for (let n = loaded + 1; n <= end; n++) {
+    const b = business(n);
+    const card = document.createElement('div');
+    card.setAttribute('role', 'article');
+    card.setAttribute('aria-label', b.name);
+    card.innerHTML = `<a style="display:none" href="/maps/place/${encodeURIComponent(b.name)}/data=!4m7!3m6!1s0x48761b:0x${n.toString(16)}!19sBENCH${n}"></a>`
+      + `<div>${b.name}</div>`
+      + `<div><span role="img" aria-label="${b.rating} stars ${b.reviews} Reviews">${b.rating}(${b.reviews})</span></div>`
+      + `<div>${b.category} · ${b.address}</div><div>Open · Closes 6 pm</div>`
+      + (n % CONFIG.noWebsiteEvery === 0 || n % 2 ? '' : `<a data-value="Website" href="${b.website}">Website</a>`);
+    card.addEventListener('click', () => showDetails(n));
+    feed.appendChild(card);
+  }
+  loaded = end;
+}
+
+function showDetails(n) {
+  const b = business(n);
+  setTimeout(() => {
+    h1.innerText = b.name;
+    const website = n % CONFIG.noWebsiteEvery === 0 ? ''
+      : `<a data-item-id="authority" href="${b.website}">${b.website}</a>`;
+    pane.innerHTML = `
+      <span role="img" aria-label="${b.rating} stars"></span>
+      <span role="img" aria-label="${b.reviews} reviews"></span>
+      <button jsaction="pane.rating.category">${b.category}</button>
+      <button data-item-id="address">${b.address}</button>
+      <button data-item-id="phone:tel:${b.phone.replace(/ /g, '')}" aria-label="Phone: ${b.phone}">${b.phone}</button>
+      ${website}`;
+  }, CONFIG.detailLatency);
+}
+
+feed.addEventListener('scroll', () => {
+  if (loading || loaded >= CONFIG.cards) return;
+  if (feed.scrollTop + feed.clientHeight < feed.scrollHeight - 10) return;
+  loading = true;
+  setTimeout(() => { addCards(); loading = false; }, CONFIG.scrollLatency);
+});
+
+addCards();
+</script></body></html>
+"""
+
+FILLER = ("Family run business serving the local area for over twenty years. "
+          "Walk-ins welcome, bookings recommended at weekends. Gift cards available in store. ") * 6
+
+def site_homepage(n):
+    """Homepage of business n - every third one has its email right there"""
+
+    email = f'<p>Email: <a href="mailto:hello@site{n}.example">hello@site{n}.example</a></p>' if n % 3 == 0 else ''
+    return f"""<!DOCTYPE html><html><head><title>Business {n}</title></head><body>
+<nav><a href="/site/{n}/">Home</a> <a href="/site/{n}/services">Services</a> <a href="/site/{n}/contact">Contact us</a></nav>
+<h1>Business {n}</h1><p>{FILLER}</p>{email}
+<footer><a href="https://www.instagram.com/business_{n}/">Instagram</a>
+<a href="https://www.facebook.com/business{n}">Facebook</a></footer>
+</body></html>"""
+
+def site_contact(n):
+    return f"""<!DOCTYPE html><html><head><title>Contact</title></head><body>
+<h1>Contact Business {n}</h1><p>{FILLER}</p>
+<p>Write to info@site{n}.example or call us.</p></body></html>"""
+
+class FakeMapsServer:
+    """Threaded HTTP server on 127.0.0.1 (random port) run from a background thread"""
+
+    def __init__(self, cards=200, batch=20, scroll_latency=300, detail_latency=150, site_latency=100,
+                 no_website_every=5):
+        self.config = {
+            'cards': cards,
+            'batch': batch,
+            'scrollLatency': scroll_latency,
+            'detailLatency': detail_latency,
+            'noWebsiteEvery': no_website_every,
+        }
+        self.site_latency = site_latency
+        self.requests = 0
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        self.config['siteBase'] = self.base_url
+        self._thread = None
+
+    @property
+    def search_url(self):
+        """Template for iter_google_maps_search(search_url=...)"""
+
+        return self.base_url + '/maps/search/{query}'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                parts = [part for part in self.path.split('?')[0].split('/') if part]
+
+                if parts[:2] == ['maps', 'search']:
+                    return self._send(200, SEARCH_PAGE.replace('__CONFIG__', json.dumps(server.config)))
+
+                if parts[:1] == ['site'] and len(parts) >= 2 and parts[1].isdigit():
+                    time.sleep(server.site_latency / 1000)
+                    n = int(parts[1])
+                    if len(parts) == 2:
+                        return self._send(200, site_homepage(n))
+                    if parts[2] == 'contact':
+                        return self._send(200, site_contact(n))
+
+                self._send(404, '<html><body><h1>Not found</h1></body></html>')
+
+            def _send(self, status, body):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-maps', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
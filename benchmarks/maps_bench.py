@@ -0,0 +1,241 @@
+"""
+Offline scraper benchmark
+Runs iter_google_maps_search and scrape_website_for_contacts against the
+local stand-in in fake_maps.py and reports cards/sec, sites/sec, p50/p95
+latencies and peak RSS. Results are written to a JSON file so runs can be
+compared. Browser memory is only measured when psutil is installed.
+
+    python benchmarks/maps_bench.py --cards 200 --site-latency 100 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+
+from fake_maps import FakeMapsServer
+from gmaps_scraper import (CONTACT_ENGINES, SCRAPE_MODES, USER_AGENT, WAIT_MODES, BrowserFetcher, HttpFetcher,
+                           PagePool, aiohttp, iter_google_maps_search, scrape_website_for_contacts)
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+# Optional - samples the browser's memory during the run
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (0.0 when empty)"""
+
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+def latency_summary(seconds):
+    return {
+        'count': len(seconds),
+        'p50_ms': round(percentile(seconds, 50) * 1000, 1),
+        'p95_ms': round(percentile(seconds, 95) * 1000, 1),
+        'max_ms': round(max(seconds, default=0.0) * 1000, 1),
+    }
+
+def peak_rss_mb():
+    """Peak resident memory of this process, in MB"""
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+class BrowserMemory:
+    """
+    Samples the summed RSS of every process under this one (the Playwright
+    driver and all Chromium processes) and keeps the peak. Shared pages are
+    counted once per process, so this overstates what the OS really uses
+    """
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak = 0
+        self._task = None
+
+    def sample(self):
+        total = 0
+        for child in psutil.Process().children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        self.peak = max(self.peak, total)
+
+    async def _watch(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if psutil is not None:
+            self._task = asyncio.create_task(self._watch())
+        return self
+
+    async def stop(self):
+        """Stop sampling - returns the peak in MB, or None without psutil"""
+
+        if self._task is None:
+            return None
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        return round(self.peak / (1024 * 1024), 1)
+
+async def bench_maps(context, server, cards, wait_mode, mode):
+    """Scrape the fake search page - returns (businesses, elapsed s, seconds per card)"""
+
+    page = await context.new_page()
+    businesses = []
+    per_card = []
+    start = last = time.perf_counter()
+    async for business in iter_google_maps_search(page, 'bench query', cards, wait_mode,
+                                                  search_url=server.search_url, mode=mode):
+        now = time.perf_counter()
+        per_card.append(now - last)
+        last = now
+        businesses.append(business)
+    elapsed = time.perf_counter() - start
+    await page.close()
+    return businesses, elapsed, per_card
+
+async def bench_websites(context, businesses, engine, workers, wait_mode):
+    """Enrich the businesses from the fake sites - returns (elapsed s, seconds per site, emails found)"""
+
+    page_pool = await PagePool.open(context, workers)
+    session = None
+    if engine == 'http':
+        session = HttpFetcher.create_session(workers)
+        fetchers = [HttpFetcher(session, page_pool, wait_mode)] * workers
+    else:
+        fetchers = [BrowserFetcher(page, wait_mode) for page in page_pool.pages]
+
+    queue = asyncio.Queue()
+    for business in businesses:
+        if business.get('website'):
+            queue.put_nowait(business)
+
+    per_site = []
+
+    async def worker(fetcher):
+        while True:
+            try:
+                business = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            await scrape_website_for_contacts(fetcher, business)
+            per_site.append(time.perf_counter() - started)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(fetcher) for fetcher in fetchers])
+    elapsed = time.perf_counter() - start
+
+    await page_pool.close()
+    if session is not None:
+        await session.close()
+    return elapsed, per_site, sum(1 for b in businesses if b.get('email'))
+
+async def run(args):
+    engine = args.engine
+    if engine == 'http' and aiohttp is None:
+        print("⚠️  aiohttp not installed - benchmarking the browser engine")
+        engine = 'browser'
+
+    server = FakeMapsServer(cards=args.cards, scroll_latency=args.scroll_latency,
+                            detail_latency=args.detail_latency, site_latency=args.site_latency)
+    with server:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, args=['--no-sandbox', '--disable-dev-shm-usage'])
+            context = await browser.new_context(viewport={'width': 1920, 'height': 1080}, user_agent=USER_AGENT)
+            browser_memory = BrowserMemory().start()
+
+            print(f"📍 Maps: {args.cards} cards, {args.mode} mode "
+                  f"({args.scroll_latency}ms scroll, {args.detail_latency}ms detail)")
+            businesses, maps_elapsed, per_card = await bench_maps(context, server, args.cards, args.wait_mode,
+                                                                  args.mode)
+
+            sites_elapsed, per_site, emails = 0.0, [], 0
+            if not args.no_contacts:
+                print(f"🌐 Websites: {engine} engine, {args.workers} workers ({args.site_latency}ms per request)")
+                sites_elapsed, per_site, emails = await bench_websites(context, businesses, engine,
+                                                                       args.workers, args.wait_mode)
+
+            browser_peak = await browser_memory.stop()
+            await browser.close()
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': dict(vars(args), engine=engine),
+        'maps': {
+            'cards': len(businesses),
+            'seconds': round(maps_elapsed, 2),
+            'cards_per_sec': round(len(businesses) / maps_elapsed, 2) if maps_elapsed else 0.0,
+            'card_latency': latency_summary(per_card),
+        },
+        'websites': {
+            'sites': len(per_site),
+            'emails': emails,
+            'seconds': round(sites_elapsed, 2),
+            'sites_per_sec': round(len(per_site) / sites_elapsed, 2) if sites_elapsed else 0.0,
+            'site_latency': latency_summary(per_site),
+        },
+        'server_requests': server.requests,
+        'peak_rss_mb': {'python': peak_rss_mb(), 'browser': browser_peak},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the scraper against a local Google Maps stand-in')
+    parser.add_argument('--cards', type=int, default=200, help='Cards in the fake search feed')
+    parser.add_argument('--scroll-latency', type=int, default=300, help='ms before scrolled cards appear')
+    parser.add_argument('--detail-latency', type=int, default=150, help='ms before a clicked card shows its details')
+    parser.add_argument('--site-latency', type=int, default=100, help='ms per business website request')
+    parser.add_argument('--engine', choices=CONTACT_ENGINES, default='http', help='Contact engine to benchmark')
+    parser.add_argument('--workers', type=int, default=10, help='Websites crawled in parallel')
+    parser.add_argument('--wait-mode', choices=WAIT_MODES, default='adaptive')
+    parser.add_argument('--mode', choices=SCRAPE_MODES, default='detail', help='Maps scrape mode to benchmark')
+    parser.add_argument('--no-contacts', action='store_true', help='Only benchmark the Maps phase')
+    parser.add_argument('--output', default='benchmark.json', help='JSON results file')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+
+    maps, websites = result['maps'], result['websites']
+    print("\n" + "="*60)
+    print("📊 BENCHMARK")
+    print("="*60)
+    print(f"Maps:     {maps['cards_per_sec']:.2f} cards/sec  "
+          f"(p50 {maps['card_latency']['p50_ms']}ms, p95 {maps['card_latency']['p95_ms']}ms)")
+    if websites['sites']:
+        print(f"Websites: {websites['sites_per_sec']:.2f} sites/sec  "
+              f"(p50 {websites['site_latency']['p50_ms']}ms, p95 {websites['site_latency']['p95_ms']}ms, "
+              f"{websites['emails']} emails)")
+    browser_peak = result['peak_rss_mb']['browser']
+    browser_note = f"{browser_peak} MB browser" if browser_peak is not None else "browser not measured (pip install psutil)"
+    print(f"Peak RSS: {result['peak_rss_mb']['python']} MB python, {browser_note}")
+    print(f"💾 Saved to: {args.output}")
+    print("="*60)
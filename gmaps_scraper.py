@@ -13,10 +13,36 @@ if platform.system() == 'Windows':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 import csv
+import json
+import multiprocessing
+import os
 import re
+import sqlite3
+import threading
 import time
+import queue
+from collections import namedtuple
+from contextlib import asynccontextmanager, contextmanager
 from playwright.async_api import async_playwright
 from datetime import datetime
+from html import unescape
+from urllib.parse import parse_qsl, unquote, urlencode, urljoin, urlsplit
+
+# Optional - the fast HTTP engine for contact extraction. Without it every
+# website is loaded in a browser tab.
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Optional - Parquet export from the result store
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 
 # ============================================================================
 # PATTERNS
@@ -33,8 +59,44 @@ SOCIAL_PATTERNS = {
     'youtube': re.compile(r'(?:https?://)?(?:www\.)?youtube\.com/(?:c|channel|user|@)([a-zA-Z0-9_-]+)/?'),
 }
 
+# The same patterns split for scan_contacts(): the literal each match has to
+# contain (found with str.find) and the handle that must follow it
+EMAIL_LOCAL_CHARS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789._%+-')
+EMAIL_DOMAIN_CHARS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.-|')
+EMAIL_FALSE_POSITIVES = ['wixpress', 'sentry', 'gstatic', 'schema.org']
+
+SOCIAL_SCAN = {
+    'instagram': (['instagram.com/'], re.compile(r'([a-zA-Z0-9._]+)')),
+    'facebook': (['facebook.com/'], re.compile(r'([a-zA-Z0-9.]+)')),
+    'twitter': (['twitter.com/', 'x.com/'], re.compile(r'([a-zA-Z0-9_]+)')),
+    'tiktok': (['tiktok.com/'], re.compile(r'@([a-zA-Z0-9._]+)')),
+    'linkedin': (['linkedin.com/'], re.compile(r'(?:company|in)/([a-zA-Z0-9-]+)')),
+    'youtube': (['youtube.com/'], re.compile(r'(?:c|channel|user|@)([a-zA-Z0-9_-]+)')),
+}
+
+CONTACT_FIELDS = ['email', 'instagram', 'facebook', 'twitter', 'tiktok', 'linkedin', 'youtube']
+
 PHONE_PATTERN = re.compile(r'[\+\(]?[0-9][0-9 \.\-\(\)]{8,}[0-9]')
 
+LINK_PATTERN = re.compile(r'<a\s[^>]*href', re.IGNORECASE)
+SCRIPT_STYLE_PATTERN = re.compile(r'<(script|style|noscript)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Query parameters that only say where a click came from
+TRACKING_PARAM_PREFIXES = ('utm_', 'gclid', 'gbraid', 'wbraid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', 'y_source')
+
+# Place identity inside a Google Maps /maps/place/ link: the feature ID
+# (!1s0x...:0x...) or the place ID (!19sChIJ...)
+PLACE_FEATURE_PATTERN = re.compile(r'!1s(0x[0-9a-fA-F]+:0x[0-9a-fA-F]+)')
+PLACE_ID_PATTERN = re.compile(r'!19s([A-Za-z0-9_-]+)')
+
+RATING_PATTERN = re.compile(r'([\d\.]+) stars')
+REVIEWS_PATTERN = re.compile(r'([\d,]+) reviews')
+
+# Feed cards write these differently: "4.5 stars 1,234 Reviews" or "4.5(1,234)"
+CARD_REVIEWS_PATTERN = re.compile(r'([\d,]+) reviews', re.IGNORECASE)
+CARD_RATING_LINE_PATTERN = re.compile(r'^\s*([\d\.]+)\s*\(([\d,]+)\)')
+
 # ============================================================================
 # EXTRACTION FUNCTIONS
 # ============================================================================
@@ -64,426 +126,2949 @@ def extract_phone(text):
     matches = PHONE_PATTERN.findall(text)
     return matches[0] if matches else ""
 
-# ============================================================================
-# GOOGLE MAPS SCRAPER
-# ============================================================================
+ContactScan = namedtuple('ContactScan', ['emails', 'socials', 'phone'])
+
+def _scan_emails(text):
+    """extract_emails() without scanning every character: only the text around each '@' is matched"""
+    
+    emails = {}
+    resume_at = 0
+    at = text.find('@')
+    while at != -1:
+        start = at
+        while start > resume_at and text[start - 1] in EMAIL_LOCAL_CHARS:
+            start -= 1
+        end = at + 1
+        while end < len(text) and text[end] in EMAIL_DOMAIN_CHARS:
+            end += 1
+        
+        # endpos keeps one character past the window so \b sees the real text
+        match = EMAIL_PATTERN.search(text, start, end + 1) if start < at else None
+        if match:
+            email = match.group()
+            lowered = email.lower()
+            if not any(x in lowered for x in EMAIL_FALSE_POSITIVES):
+                emails[email] = True
+            resume_at = match.end()
+        at = text.find('@', at + 1)
+    
+    return list(emails)
+
+def _scan_social(text, literals, handle):
+    """First handle after any of the literals - the first match of its SOCIAL_PATTERNS entry"""
+    
+    first = None
+    for literal in literals:
+        pos = text.find(literal)
+        while pos != -1 and (first is None or pos < first[0]):
+            match = handle.match(text, pos + len(literal))
+            if match:
+                first = (pos, match.group(1))
+                break
+            pos = text.find(literal, pos + 1)
+    return first[1] if first else None
 
-async def scrape_google_maps_search(page, query, max_results=1000):
+def scan_contacts(text, socials=True, phone=False):
     """
-    Scrape Google Maps search results
-    NO LIMIT - scrape as many as you want!
+    Emails, socials and (optionally) phone from one page in a single pass
+    per literal instead of one regex scan per field. Gives the same results
+    as extract_emails(), extract_socials() and extract_phone(), except that
+    the emails come back unique in page order.
     """
     
-    print(f"\n{'='*60}")
-    print(f"🔍 Query: {query}")
-    print(f"📊 Target: {max_results} results")
-    print(f"{'='*60}")
+    found = {}
+    if socials:
+        for site, (literals, handle) in SOCIAL_SCAN.items():
+            name = _scan_social(text, literals, handle)
+            if name is not None:
+                found[site] = f"https://x.com/{name}" if site == 'twitter' else f"https://{site}.com/{name}"
     
-    # Go to Google Maps
-    await page.goto(f"https://www.google.com/maps/search/{query.replace(' ', '+')}")
-    await page.wait_for_timeout(3000)
+    number = ""
+    if phone:
+        match = PHONE_PATTERN.search(text)
+        number = match.group() if match else ""
     
-    # Handle consent if it appears
-    try:
-        consent = page.locator('button:has-text("Accept all"), button:has-text("Reject all")').first
-        if await consent.count() > 0:
-            await consent.click()
-            await page.wait_for_timeout(2000)
-    except:
-        pass
+    return ContactScan(_scan_emails(text), found, number)
+
+def normalize_website(url):
+    """
+    Canonical form of a website URL: no scheme, no 'www.', no trailing slash,
+    no fragment and no tracking parameters (utm_*, gclid, ...)
+    """
     
-    # Wait for results
+    url = url.strip()
     try:
-        await page.wait_for_selector('[role="feed"]', timeout=10000)
-    except:
-        print("❌ No results found!")
-        return []
+        parts = urlsplit(url if '://' in url else f"http://{url}")
+        host = (parts.hostname or '').lower()
+        port = parts.port
+    except ValueError:
+        # Malformed (bad port, broken IPv6 brackets) - still a usable key
+        return url.lower()
     
-    # Scroll to load ALL results
-    print("📜 Scrolling to load results...")
+    if host.startswith('www.'):
+        host = host[4:]
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
     
-    last_height = 0
-    no_change_count = 0
-    results_found = 0
-    
-    while results_found < max_results and no_change_count < 5:
-        # Scroll
-        await page.evaluate("""
-            const feed = document.querySelector('[role="feed"]');
-            if (feed) {
-                feed.scrollTo(0, feed.scrollHeight);
-            }
-        """)
-        
-        await page.wait_for_timeout(2000)
-        
-        # Check current results
-        cards = await page.locator('[role="article"]').all()
-        results_found = len(cards)
-        
-        # Check if we reached the end
-        current_height = await page.evaluate("""
-            const feed = document.querySelector('[role="feed"]');
-            return feed ? feed.scrollHeight : 0;
-        """)
-        
-        if current_height == last_height:
-            no_change_count += 1
-        else:
-            no_change_count = 0
-            last_height = current_height
-        
-        # Progress
-        if results_found % 20 == 0:
-            print(f"   Found {results_found} results...")
+    params = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+              if not key.lower().startswith(TRACKING_PARAM_PREFIXES)]
+    query = f"?{urlencode(sorted(params))}" if params else ""
     
-    print(f"✅ Total cards found: {results_found}")
+    return f"{host}{parts.path.rstrip('/')}{query}"
+
+def place_id(url):
+    """Feature ID (or place ID) in a Google Maps place link, or "" if there is none"""
     
-    # Extract all business data
-    results = []
-    cards = await page.locator('[role="article"]').all()
+    match = PLACE_FEATURE_PATTERN.search(url or '') or PLACE_ID_PATTERN.search(url or '')
+    return match.group(1) if match else ""
+
+def place_key(url):
+    """Stable identity of a Google Maps place link, or "" if there is none"""
     
-    for idx, card in enumerate(cards[:max_results], 1):
-        try:
-            # Click card to show details
-            await card.click()
-            await page.wait_for_timeout(1200)
-            
-            # Extract ALL data
-            business = {}
-            
-            # Title
-            title_elem = page.locator('h1').first
-            business['title'] = await title_elem.inner_text() if await title_elem.count() > 0 else ""
-            
-            # Get the whole page content for extraction
-            content = await page.content()
-            
-            # Phone - try button first
-            phone = ""
-            try:
-                phone_button = page.locator('button[data-item-id*="phone"]').first
-                if await phone_button.count() > 0:
-                    aria = await phone_button.get_attribute('aria-label')
-                    if aria:
-                        phone = extract_phone(aria)
-            except:
-                pass
-            
-            if not phone:
-                phone = extract_phone(content)
-            
-            business['phone'] = phone
-            
-            # Website
-            website = ""
-            try:
-                website_link = page.locator('a[data-item-id="authority"]').first
-                if await website_link.count() > 0:
-                    website = await website_link.get_attribute('href')
-            except:
-                pass
-            business['website'] = website or ""
-            
-            # Address
-            address = ""
-            try:
-                address_button = page.locator('button[data-item-id="address"]').first
-                if await address_button.count() > 0:
-                    address = await address_button.inner_text()
-            except:
-                pass
-            business['address'] = address or ""
-            
-            # Rating
-            rating = ""
-            try:
-                rating_elem = page.locator('[role="img"][aria-label*="stars"]').first
-                if await rating_elem.count() > 0:
-                    aria = await rating_elem.get_attribute('aria-label')
-                    if aria:
-                        match = re.search(r'([\d\.]+) stars', aria)
-                        if match:
-                            rating = match.group(1)
-            except:
-                pass
-            business['rating'] = rating or ""
-            
-            # Reviews
-            reviews = ""
-            try:
-                reviews_elem = page.locator('[role="img"][aria-label*="reviews"]').first
-                if await reviews_elem.count() > 0:
-                    aria = await reviews_elem.get_attribute('aria-label')
-                    if aria:
-                        match = re.search(r'([\d,]+) reviews', aria)
-                        if match:
-                            reviews = match.group(1)
-            except:
-                pass
-            business['reviews'] = reviews or ""
-            
-            # Category
-            category = ""
-            try:
-                category_button = page.locator('button[jsaction*="category"]').first
-                if await category_button.count() > 0:
-                    category = await category_button.inner_text()
-            except:
-                pass
-            business['category'] = category or ""
-            
-            # Initialize social/email fields
-            business['email'] = ''
-            business['instagram'] = ''
-            business['facebook'] = ''
-            business['twitter'] = ''
-            business['tiktok'] = ''
-            business['linkedin'] = ''
-            business['youtube'] = ''
-            business['query'] = query
-            
-            results.append(business)
-            
-            if idx % 10 == 0:
-                print(f"   Extracted {idx}/{min(len(cards), max_results)}")
-            
-        except Exception as e:
-            print(f"   ⚠️  Error on card {idx}: {str(e)}")
-            continue
+    if not url:
+        return ""
     
-    print(f"✅ Extracted {len(results)} businesses")
-    return results
+    found = place_id(url)
+    if found:
+        return f"place:{found}"
+    
+    # No ID in the link - the place path without the volatile map state will do
+    path = urlsplit(url).path
+    if '/maps/place/' not in path:
+        return ""
+    return f"place:{path.split('/data=')[0].split('/@')[0].rstrip('/').lower()}"
 
-# ============================================================================
-# WEBSITE SCRAPER (EMAILS + SOCIALS)
-# ============================================================================
+def business_identity(business):
+    """Fallback identity from normalised title + address + phone, or "" if all are empty"""
+    
+    title = ' '.join(re.sub(r'[^\w]+', ' ', business.get('title', '').lower()).split())
+    address = ' '.join(re.sub(r'[^\w]+', ' ', business.get('address', '').lower()).split())
+    phone = re.sub(r'\D', '', business.get('phone', ''))
+    
+    if not (title or address or phone):
+        return ""
+    return f"business:{title}|{address}|{phone}"
 
-async def scrape_website_for_contacts(page, business):
-    """Extract emails and social media from business website"""
+def payload_size(data):
+    """Approximate bytes of a page.evaluate() result as it crosses the wire"""
+    return len(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+def parse_detail_pane(pane, query):
+    """Build a business record from the raw fields read by DETAIL_PANE_JS"""
     
-    website = business.get('website', '')
+    business = {}
+    business['title'] = pane.get('title') or ""
+    business['phone'] = extract_phone(pane['phone']) if pane.get('phone') else ""
+    if not business['phone'] and pane.get('paneText'):
+        # No phone button - fall back to the detail pane's text
+        business['phone'] = extract_phone(pane['paneText'])
+    business['website'] = pane.get('website') or ""
+    business['address'] = pane.get('address') or ""
     
-    if not website:
-        return business
+    rating = RATING_PATTERN.search(pane.get('rating') or "")
+    business['rating'] = rating.group(1) if rating else ""
     
-    # Check if website IS social media
-    if 'instagram.com' in website:
-        business['instagram'] = website
-        return business
-    elif 'facebook.com' in website:
-        business['facebook'] = website
-        return business
-    elif 'tiktok.com' in website:
-        business['tiktok'] = website
-        return business
-    elif 'twitter.com' in website or 'x.com' in website:
-        business['twitter'] = website
-        return business
-    elif 'linkedin.com' in website:
-        business['linkedin'] = website
-        return business
+    reviews = REVIEWS_PATTERN.search(pane.get('reviews') or "")
+    business['reviews'] = reviews.group(1) if reviews else ""
     
-    # It's a real website - extract contacts
-    try:
-        await page.goto(website, timeout=8000, wait_until='domcontentloaded')
-        await page.wait_for_timeout(1500)
-        
-        # Get content
-        html = await page.content()
-        
-        # Extract emails
-        emails = extract_emails(html)
-        if emails:
-            business['email'] = emails[0]
-        
-        # Extract socials
-        socials = extract_socials(html)
-        business['instagram'] = socials.get('instagram', '')
-        business['facebook'] = socials.get('facebook', '')
-        business['twitter'] = socials.get('twitter', '')
-        business['tiktok'] = socials.get('tiktok', '')
-        business['linkedin'] = socials.get('linkedin', '')
-        business['youtube'] = socials.get('youtube', '')
-        
-        # Try contact page if no email
-        if not business['email']:
-            for path in ['/contact', '/contact-us', '/about', '/about-us']:
-                try:
-                    await page.goto(f"{website.rstrip('/')}{path}", timeout=5000)
-                    await page.wait_for_timeout(1000)
-                    html = await page.content()
-                    emails = extract_emails(html)
-                    if emails:
-                        business['email'] = emails[0]
-                        break
-                except:
-                    continue
-        
-    except Exception as e:
-        pass
+    business['category'] = pane.get('category') or ""
+    
+    # Initialize social/email fields
+    business['email'] = ''
+    business['instagram'] = ''
+    business['facebook'] = ''
+    business['twitter'] = ''
+    business['tiktok'] = ''
+    business['linkedin'] = ''
+    business['youtube'] = ''
+    business['query'] = query
+    business['queries'] = [query]
+    business['place_url'] = ''
+    
+    return business
+
+def parse_feed_card(info, query):
+    """
+    Build a business record from a feed card alone (HARVEST_CARDS_JS with
+    withFields) - no click. Title, rating, reviews, category and place link
+    are reliable; address, phone and website only when the card shows them.
+    """
+    
+    lines = [line.strip() for line in (info.get('text') or '').split('\n') if line.strip()]
+    title = info.get('label') or (lines[0] if lines else '')
+    stars = info.get('stars') or ''
+    
+    rating = RATING_PATTERN.search(stars)
+    reviews = CARD_REVIEWS_PATTERN.search(stars)
+    rating_line = next((m for m in map(CARD_RATING_LINE_PATTERN.match, lines) if m), None)
     
+    # "Category · Address" (Maps puts icon glyphs between some parts)
+    category = address = ''
+    for line in lines:
+        if line == title or '·' not in line or CARD_RATING_LINE_PATTERN.match(line):
+            continue
+        parts = [part.strip() for part in line.split('·') if any(c.isalnum() for c in part)]
+        if parts:
+            category = parts[0]
+            address = parts[-1] if len(parts) > 1 else ''
+        break
+    
+    business = parse_detail_pane({
+        'title': title,
+        'address': address,
+        'website': info.get('website') or '',
+        'category': category,
+        'paneText': '\n'.join(line for line in lines if line != title and not CARD_RATING_LINE_PATTERN.match(line)),
+    }, query)
+    business['rating'] = rating.group(1) if rating else (rating_line.group(1) if rating_line else '')
+    business['reviews'] = reviews.group(1) if reviews else (rating_line.group(2) if rating_line else '')
+    business['place_url'] = info.get('href') or ''
     return business
 
 # ============================================================================
-# MAIN FUNCTION
+# METRICS
 # ============================================================================
 
-async def scrape_all(queries, max_results_per_query=1000, extract_contacts=True):
+# Histogram bucket upper bounds in seconds (Prometheus 'le' labels)
+LATENCY_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+class Metrics:
     """
-    Main scraping function
-    NO LIMITS - scrape as much as you need!
+    Run-wide counters, per-stage latency histograms and error counts (per
+    stage and exception type). Exported as JSON at the end of a run and as
+    a Prometheus text file while it runs.
     """
     
-    all_results = []
+    def __init__(self):
+        self.reset()
     
-    async with async_playwright() as p:
-        # Launch browser
-        browser = await p.chromium.launch(
-            headless=True,
-            args=['--no-sandbox', '--disable-dev-shm-usage']
-        )
+    def reset(self):
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.stages = {}
+        self.errors = {}
+    
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+    
+    def gauge(self, name, value):
+        self.gauges[name] = value
+    
+    def observe(self, stage, seconds):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = {'count': 0, 'sum': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS) + 1)}
+        histogram['count'] += 1
+        histogram['sum'] += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram['buckets'][i] += 1
+                break
+        else:
+            histogram['buckets'][-1] += 1
+    
+    def error(self, stage, exc):
+        key = (stage, type(exc).__name__)
+        self.errors[key] = self.errors.get(key, 0) + 1
+    
+    @contextmanager
+    def time(self, stage):
+        """Time a block as one observation of stage; an exception is also counted as an error"""
         
-        context = await browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.error(stage, e)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+    
+    @staticmethod
+    def quantile(histogram, q):
+        """Upper bound of the bucket holding the q-quantile (seconds)"""
         
-        # Phase 1: Scrape Google Maps
-        print("\n" + "="*60)
-        print("📍 PHASE 1: GOOGLE MAPS SCRAPING")
-        print("="*60)
+        target = q * histogram['count']
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS + [float('inf')], histogram['buckets']):
+            seen += n
+            if n and seen >= target:
+                return bound
+        return 0.0
+    
+    def snapshot(self):
+        """Everything as a JSON-friendly dict (what the JSON export and the app read)"""
         
-        maps_page = await context.new_page()
+        return {
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'elapsed': round(time.time() - self.started, 1),
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'stages': {
+                stage: {
+                    'count': h['count'],
+                    'sum': round(h['sum'], 3),
+                    'avg': round(h['sum'] / h['count'], 3) if h['count'] else 0.0,
+                    'p50': self.quantile(h, 0.5),
+                    'p95': self.quantile(h, 0.95),
+                    'buckets': list(h['buckets']),
+                }
+                for stage, h in self.stages.items()
+            },
+            'errors': [
+                {'stage': stage, 'type': kind, 'count': n}
+                for (stage, kind), n in sorted(self.errors.items())
+            ],
+        }
+    
+    def merge(self, snapshot):
+        """Add another run's snapshot (e.g. from a shard process) into this one"""
+        
+        for name, n in snapshot['counters'].items():
+            self.count(name, n)
+        # Shards' gauges add up (e.g. concurrency limits -> slots in total)
+        for name, value in snapshot.get('gauges', {}).items():
+            self.gauge(name, self.gauges.get(name, 0) + value)
+        for stage, data in snapshot['stages'].items():
+            histogram = self.stages.setdefault(
+                stage, {'count': 0, 'sum': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS) + 1)})
+            histogram['count'] += data['count']
+            histogram['sum'] += data['sum']
+            histogram['buckets'] = [a + b for a, b in zip(histogram['buckets'], data['buckets'])]
+        for error in snapshot['errors']:
+            key = (error['stage'], error['type'])
+            self.errors[key] = self.errors.get(key, 0) + error['count']
+    
+    def save_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+    
+    def prometheus_text(self):
+        lines = [
+            '# TYPE gmaps_events_total counter',
+            *(f'gmaps_events_total{{event="{name}"}} {n}' for name, n in sorted(self.counters.items())),
+            '# TYPE gmaps_gauge gauge',
+            *(f'gmaps_gauge{{gauge="{name}"}} {value}' for name, value in sorted(self.gauges.items())),
+            '# TYPE gmaps_stage_seconds histogram',
+        ]
+        for stage, h in sorted(self.stages.items()):
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS + ['+Inf'], h['buckets']):
+                cumulative += n
+                lines.append(f'gmaps_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'gmaps_stage_seconds_sum{{stage="{stage}"}} {h["sum"]:.6f}')
+            lines.append(f'gmaps_stage_seconds_count{{stage="{stage}"}} {h["count"]}')
+        lines.append('# TYPE gmaps_errors_total counter')
+        for (stage, kind), n in sorted(self.errors.items()):
+            lines.append(f'gmaps_errors_total{{stage="{stage}",type="{kind}"}} {n}')
+        return '\n'.join(lines) + '\n'
+    
+    def write_prometheus(self, path):
+        """Replace the text file atomically so a scraper never reads half of it"""
         
-        for idx, query in enumerate(queries, 1):
-            print(f"\n[{idx}/{len(queries)}]")
-            results = await scrape_google_maps_search(maps_page, query, max_results_per_query)
-            all_results.extend(results)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+    
+    def print_report(self):
+        if not self.stages:
+            return
+        print("\n⏱️  Time per stage (count, avg, p95):")
+        for stage, h in sorted(self.stages.items(), key=lambda item: -item[1]['sum']):
+            p95 = self.quantile(h, 0.95)
+            # The overflow bucket has no upper bound
+            p95 = f"<={p95}s" if p95 != float('inf') else f">{LATENCY_BUCKETS[-1]}s"
+            print(f"   {stage:<18} {h['count']:6d}  {h['sum'] / h['count']:6.2f}s  {p95}")
+        errors = sum(self.errors.values())
+        if errors:
+            print(f"   ⚠️  {errors} errors: " + ', '.join(
+                f"{stage}/{kind} x{n}" for (stage, kind), n in sorted(self.errors.items(), key=lambda item: -item[1])[:5]))
+
+# Shared by everything in this process; scrape_all() resets it per run
+METRICS = Metrics()
+
+async def export_metrics(path, interval):
+    """Rewrite the Prometheus text file every interval seconds until cancelled"""
+    
+    while True:
+        await asyncio.sleep(interval)
+        METRICS.write_prometheus(path)
+
+# ============================================================================
+# ADAPTIVE CONCURRENCY
+# ============================================================================
+
+# Events per adjustment window (at least - a window is also one round of
+# the current limit)
+LIMITER_MIN_WINDOW = 8
+
+# How far the latency baseline follows a slower window - it drops to a
+# faster one at once, but only creeps up so that our own load can't
+# become the new normal
+LIMITER_BASELINE_DRIFT = 0.05
+
+# Faster than this is a cache hit or a skipped site, not a latency sample
+LIMITER_MIN_SAMPLE = 0.05
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for a pool of workers. A worker holds a slot
+    (acquire/release or `async with limiter.slot()`) while it works, and
+    reports every unit of work with record(). Once per window the limit
+    goes up by one if the pool was busy and healthy (doubling until the
+    first cut - a slow start), and is halved when:
+    
+    - the window's median latency is more than `slowdown` times the
+      baseline - roughly the best window median seen, drifting up slowly
+      as the mix of work changes (the machine or the remote side is
+      struggling), or
+    - more than max_failure_rate of the window's work failed (timeouts,
+      errors)
+    
+    record(blocked=True) - a captcha or a consent wall - halves it at once.
+    The limit always stays within minimum..maximum; a lower limit lets
+    busy workers finish and holds back the next ones.
+    """
+    
+    def __init__(self, name, minimum, maximum, initial=None, slowdown=2.0, max_failure_rate=0.2, decrease=0.5):
+        self.name = name
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = max(self.minimum, min(self.maximum, initial or self.minimum))
+        self.slowdown = slowdown
+        self.max_failure_rate = max_failure_rate
+        self.decrease = decrease
+        self.active = 0
+        self.increases = 0
+        self.decreases = 0
+        self.peak = self.limit
+        self._slow_start = True
+        self._waiters = []
+        self.baseline = None
+        self._reset_window()
+        METRICS.gauge(f'{name}_limit', self.limit)
+    
+    def _reset_window(self):
+        self._latencies = []
+        self._events = 0
+        self._failures = 0
+        self._saturated = self.active >= self.limit
+    
+    async def acquire(self):
+        while self.active >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Pass a wake-up we may have been given on to someone else
+                self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.active += 1
+        if self.active >= self.limit:
+            self._saturated = True
+    
+    def release(self):
+        self.active -= 1
+        self._wake()
+    
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+    
+    def _wake(self):
+        free = self.limit - self.active
+        for waiter in self._waiters:
+            if free <= 0:
+                break
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+    
+    def _set_limit(self, limit):
+        self.limit = max(self.minimum, min(self.maximum, limit))
+        self.peak = max(self.peak, self.limit)
+        METRICS.gauge(f'{self.name}_limit', self.limit)
+        self._wake()
+    
+    def record(self, seconds=None, failed=False, blocked=False):
+        """One unit of work done: how long it took, or that it failed / hit a block page"""
         
-        await maps_page.close()
+        if blocked:
+            METRICS.count(f'{self.name}_blocked')
+            self._cut("blocked")
+            return
         
-        print(f"\n{'='*60}")
-        print(f"✅ PHASE 1 COMPLETE: {len(all_results)} businesses")
-        print(f"{'='*60}")
+        self._events += 1
+        if failed:
+            self._failures += 1
+        elif seconds is not None and seconds >= LIMITER_MIN_SAMPLE:
+            self._latencies.append(seconds)
         
-        # Phase 2: Extract contacts
-        if extract_contacts:
-            print("\n" + "="*60)
-            print("📧 PHASE 2: EMAIL & SOCIAL MEDIA EXTRACTION")
-            print("="*60)
-            
-            # Filter businesses with websites
-            with_websites = [b for b in all_results if b.get('website')]
-            print(f"\n🌐 {len(with_websites)} businesses have websites")
-            
-            # Create pages for parallel processing
-            num_workers = 3
-            pages = []
-            for _ in range(num_workers):
-                pages.append(await context.new_page())
-            
-            # Process in batches
-            for i in range(0, len(with_websites), num_workers):
-                batch = with_websites[i:i+num_workers]
-                
-                # Process batch in parallel
-                tasks = []
-                for idx, business in enumerate(batch):
-                    page_idx = idx % len(pages)
-                    tasks.append(scrape_website_for_contacts(pages[page_idx], business))
-                
-                await asyncio.gather(*tasks)
-                
-                progress = min(i + num_workers, len(with_websites))
-                if progress % 30 == 0 or progress == len(with_websites):
-                    print(f"   📊 Progress: {progress}/{len(with_websites)} ({progress*100//len(with_websites)}%)")
-            
-            for page in pages:
-                await page.close()
-            
-            print(f"\n✅ PHASE 2 COMPLETE!")
+        if self._events >= max(LIMITER_MIN_WINDOW, self.limit):
+            self._adjust()
+    
+    def _adjust(self):
+        failure_rate = self._failures / self._events
+        median = sorted(self._latencies)[len(self._latencies) // 2] if self._latencies else None
+        baseline = self.baseline
+        if median is not None:
+            if baseline is None or median < baseline:
+                self.baseline = median
+            else:
+                self.baseline += (median - baseline) * LIMITER_BASELINE_DRIFT
         
-        await browser.close()
+        if failure_rate > self.max_failure_rate:
+            self._cut(f"{failure_rate:.0%} failed")
+        elif median is not None and baseline and median > baseline * self.slowdown:
+            self._cut(f"median {median:.1f}s vs {baseline:.1f}s")
+        else:
+            if self._saturated and self.limit < self.maximum:
+                self.increases += 1
+                self._set_limit(self.limit * 2 if self._slow_start else self.limit + 1)
+            self._reset_window()
     
-    return all_results
+    def _cut(self, reason):
+        self._slow_start = False
+        if self.limit > self.minimum:
+            self.decreases += 1
+            METRICS.count(f'{self.name}_decreases')
+            print(f"   🎚️  {self.name}: {self.limit} -> {max(self.minimum, int(self.limit * self.decrease))} ({reason})")
+            self._set_limit(int(self.limit * self.decrease))
+        self._reset_window()
+    
+    def print_report(self):
+        print(f"   🎚️  {self.name}: settled at {self.limit} (range {self.minimum}-{self.maximum}, "
+              f"peak {self.peak}, {self.increases} up / {self.decreases} down)")
 
 # ============================================================================
-# SAVE FUNCTION
+# WAITS
 # ============================================================================
 
-def save_to_csv(results, filename):
-    """Save results to CSV"""
+# Fixed sleeps (ms) for wait_mode='sleep' - the original timing, kept for
+# compatibility and for debugging when Google changes its markup
+SLEEP_WAITS = {
+    'search': 3000,
+    'consent': 2000,
+    'scroll': 2000,
+    'card': 1200,
+    'website': 1500,
+    'contact_page': 1000,
+}
+
+# Upper bounds (ms) for wait_mode='adaptive' - only reached when the
+# condition we wait for never shows up
+WAIT_CEILINGS = {
+    'search': 10000,
+    'consent': 5000,
+    'scroll': 2000,
+    'card': 3000,
+    'website': 1500,
+    'contact_page': 1000,
+}
+
+WAIT_MODES = ['adaptive', 'sleep']
+
+async def wait_step(page, step, wait_mode='adaptive', condition=None, arg=None, selector=None):
+    """
+    Wait for the page to settle after a step.
     
-    if not results:
-        print("❌ No results to save!")
+    'sleep' mode sleeps the fixed SLEEP_WAITS time. 'adaptive' mode returns
+    as soon as the JS condition is true / the selector shows up / the network
+    goes quiet, and gives up after WAIT_CEILINGS[step] without raising.
+    """
+    
+    if wait_mode == 'sleep':
+        await page.wait_for_timeout(SLEEP_WAITS[step])
         return
     
-    fieldnames = ['title', 'address', 'phone', 'website', 'email', 
-                  'instagram', 'facebook', 'twitter', 'tiktok', 'linkedin', 'youtube',
-                  'rating', 'reviews', 'category', 'query']
+    timeout = WAIT_CEILINGS[step]
+    try:
+        if condition:
+            await page.wait_for_function(condition, arg=arg, timeout=timeout)
+        elif selector:
+            await page.wait_for_selector(selector, timeout=timeout)
+        else:
+            await page.wait_for_load_state('networkidle', timeout=timeout)
+    except Exception:
+        pass
+
+# ============================================================================
+# BUSINESS INDEX (CROSS-QUERY DEDUPLICATION)
+# ============================================================================
+
+class BusinessIndex:
+    """
+    Run-wide index of businesses already scraped, keyed by place_key() and
+    business_identity(). Each key maps to the business's list of matching
+    queries (the same list object as its 'queries' field), so a repeat
+    sighting from another query just adds that query.
+    
+    The first key a business is registered with is its record_key(); the
+    businesses that gained a query are noted under it until take_grown().
+    """
     
-    with open(filename, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(results)
+    def __init__(self):
+        # key -> (queries, first key), one tuple shared by all of a business's keys
+        self._queries = {}
+        self._grown = {}
     
-    print(f"\n💾 Saved to: {filename}")
+    def __len__(self):
+        return len(self._queries)
     
-    # Print stats
-    total = len(results)
-    with_phone = sum(1 for r in results if r.get('phone'))
-    with_email = sum(1 for r in results if r.get('email'))
-    with_website = sum(1 for r in results if r.get('website'))
-    with_instagram = sum(1 for r in results if r.get('instagram'))
-    with_facebook = sum(1 for r in results if r.get('facebook'))
-    with_tiktok = sum(1 for r in results if r.get('tiktok'))
-    
-    print("\n" + "="*60)
-    print("📊 FINAL STATISTICS")
-    print("="*60)
-    print(f"Total businesses: {total}")
-    print(f"With phone:     {with_phone:4d} ({with_phone*100//total if total else 0:2d}%)")
-    print(f"With website:   {with_website:4d} ({with_website*100//total if total else 0:2d}%)")
-    print(f"With email:     {with_email:4d} ({with_email*100//total if total else 0:2d}%)")
-    print(f"With Instagram: {with_instagram:4d} ({with_instagram*100//total if total else 0:2d}%)")
-    print(f"With Facebook:  {with_facebook:4d} ({with_facebook*100//total if total else 0:2d}%)")
-    print(f"With TikTok:    {with_tiktok:4d} ({with_tiktok*100//total if total else 0:2d}%)")
-    print("="*60)
+    def merge(self, keys, queries):
+        """
+        Register keys for a business with the given queries list. Returns
+        False if one of the keys already belongs to another business - the
+        queries are then folded into that business and this one is a duplicate.
+        """
+        
+        keys = [key for key in keys if key]
+        for key in keys:
+            entry = self._queries.get(key)
+            if entry is not None and entry[0] is not queries:
+                known, first = entry
+                for query in queries:
+                    if query not in known:
+                        known.append(query)
+                        self._grown[first] = known
+                for other in keys:
+                    self._queries[other] = entry
+                return False
+        
+        if keys:
+            entry = next((self._queries[key] for key in keys if key in self._queries), (queries, keys[0]))
+            for key in keys:
+                self._queries[key] = entry
+        return True
+    
+    def release(self, keys, queries):
+        """Unregister keys that still belong to this queries list (a claim that came to nothing)"""
+        
+        for key in keys:
+            entry = self._queries.get(key)
+            if entry is not None and entry[0] is queries:
+                del self._queries[key]
+    
+    def take_grown(self):
+        """{record_key(): 'a | b'} for every business that gained a query since the last call"""
+        
+        grown, self._grown = self._grown, {}
+        return {key: ' | '.join(queries) for key, queries in grown.items()}
 
 # ============================================================================
-# CLI INTERFACE
+# GOOGLE MAPS SCRAPER
 # ============================================================================
 
-if __name__ == "__main__":
-    import argparse
+# detail: click every card, list: feed cards only, hybrid: click only the
+# cards missing a required field
+SCRAPE_MODES = ['detail', 'list', 'hybrid']
+HYBRID_REQUIRED_FIELDS = ['phone', 'website']
+
+# Where searches go - the offline benchmark points this at a local stand-in
+MAPS_SEARCH_URL = 'https://www.google.com/maps/search/{query}'
+
+CONSENT_SELECTOR = 'button:has-text("Accept all"), button:has-text("Reject all")'
+
+# Google's "unusual traffic" page and reCAPTCHA challenges
+CAPTCHA_SELECTOR = 'form#captcha-form, iframe[src*="recaptcha"]'
+
+SCROLL_FEED_JS = """() => {
+    const feed = document.querySelector('[role="feed"]');
+    if (feed) {
+        feed.scrollTo(0, feed.scrollHeight);
+    }
+    return {
+        count: document.querySelectorAll('[role="article"]').length,
+        height: feed ? feed.scrollHeight : 0,
+    };
+}"""
+
+FEED_HEIGHT_JS = """() => {
+    const feed = document.querySelector('[role="feed"]');
+    return feed ? feed.scrollHeight : 0;
+}"""
+
+# More cards, an untagged card (a virtualised feed can swap nodes without
+# growing) or a taller feed than before the scroll
+FEED_GREW_JS = """([count, height]) => {
+    const feed = document.querySelector('[role="feed"]');
+    return document.querySelectorAll('[role="article"]').length > count
+        || document.querySelector('[role="article"]:not([data-gms-seq])') !== null
+        || (feed !== null && feed.scrollHeight > height);
+}"""
+
+# Tag every card not seen before with data-gms-seq and return up to
+# `limit` of them. window.__gmsKeys maps each card's place link (or name) to
+# its sequence number, so a node the feed recycles for another business is
+# re-tagged, and a business scrolled past again isn't returned twice.
+# With withFields the card's own text, star label and website link come
+# back too, for parse_feed_card().
+HARVEST_CARDS_JS = """([limit, withFields]) => {
+    const keys = window.__gmsKeys || (window.__gmsKeys = new Map());
+    const fresh = [];
+    for (const card of document.querySelectorAll('[role="article"]')) {
+        const link = card.querySelector('a[href*="/maps/place/"]');
+        const href = link ? link.href : '';
+        const label = (card.getAttribute('aria-label') || '').trim();
+        const key = href || label;
+        if (!key) {
+            card.dataset.gmsSeq = '';
+            continue;
+        }
+        if (card.dataset.gmsKey === key) {
+            continue;
+        }
+        let seq = keys.get(key);
+        if (seq === undefined) {
+            if (fresh.length >= limit) {
+                break;
+            }
+            seq = keys.size + 1;
+            keys.set(key, seq);
+            const info = {seq: seq, label: label, href: href};
+            if (withFields) {
+                const stars = card.querySelector('[role="img"][aria-label*="star"]');
+                const website = card.querySelector('a[data-value="Website"], a[aria-label*="ebsite"]');
+                info.text = card.innerText;
+                info.stars = stars ? stars.getAttribute('aria-label') : '';
+                info.website = website ? website.href : '';
+            }
+            fresh.push(info);
+        }
+        card.dataset.gmsKey = key;
+        card.dataset.gmsSeq = String(seq);
+    }
+    return fresh;
+}"""
+
+# Start a fresh page's card registry from the keys an earlier page of the
+# same search already handed out
+SEED_KEYS_JS = """(keys) => {
+    window.__gmsKeys = new Map(keys.map((key, i) => [key, i + 1]));
+}"""
+
+# JS heap in use (Chromium only - 0 elsewhere)
+JS_HEAP_JS = """() => performance.memory ? performance.memory.usedJSHeapSize : 0"""
+
+H1_TEXT_JS = """() => {
+    const h1 = document.querySelector('h1');
+    return h1 ? h1.innerText.trim() : '';
+}"""
+
+# Everything we need from the detail pane in a single round-trip - the raw
+# aria-labels are parsed in Python by parse_detail_pane(). The pane's text
+# only comes back when there is no phone button, as a fallback for
+# extract_phone - never the whole page HTML.
+DETAIL_PANE_JS = """() => {
+    const text = (selector) => {
+        const el = document.querySelector(selector);
+        return el ? el.innerText : '';
+    };
+    const attr = (selector, name) => {
+        const el = document.querySelector(selector);
+        return el ? (el.getAttribute(name) || '') : '';
+    };
+    const phone = attr('button[data-item-id*="phone"]', 'aria-label');
+    let paneText = '';
+    if (!phone) {
+        const h1 = document.querySelector('h1');
+        const pane = h1 ? (h1.closest('[role="main"]') || h1.parentElement) : document.body;
+        paneText = pane ? pane.innerText : '';
+    }
+    return {
+        title: text('h1'),
+        phone: phone,
+        website: attr('a[data-item-id="authority"]', 'href'),
+        address: text('button[data-item-id="address"]'),
+        rating: attr('[role="img"][aria-label*="stars"]', 'aria-label'),
+        reviews: attr('[role="img"][aria-label*="reviews"]', 'aria-label'),
+        category: text('button[jsaction*="category"]'),
+        paneText: paneText,
+    };
+}"""
+
+# The detail pane switched to the clicked card: its h1 shows the card's
+# name, or at least something other than the previous business. When both
+# have the same name (chains) only the place ID in the URL tells them apart -
+# without one the wait runs to its ceiling.
+DETAIL_READY_JS = """([expected, previous, placeId]) => {
+    const h1 = document.querySelector('h1');
+    const title = h1 ? h1.innerText.trim() : '';
+    if (title === '') return false;
+    if (expected !== previous) return title === expected || title !== previous;
+    return placeId !== '' && decodeURIComponent(location.href).includes(placeId);
+}"""
+
+# Replace the Maps page after this many cards, or once its JS heap passes
+# RECYCLE_HEAP_MB (checked every RECYCLE_CHECK_EVERY cards)
+RECYCLE_AFTER_CARDS = 500
+RECYCLE_HEAP_MB = 512
+RECYCLE_CHECK_EVERY = 25
+
+class MapsTab:
+    """
+    A Maps tab whose page is replaced by a fresh one from the same context
+    when it has handled too many cards or its JS heap grows too big -
+    closing the page frees its renderer's memory, so a long run stays flat.
+    """
     
-    parser = argparse.ArgumentParser(description='Google Maps Scraper - NO LIMITS!')
-    parser.add_argument('--queries', required=True, help='Path to queries file')
-    parser.add_argument('--output', default='results.csv', help='Output CSV file')
-    parser.add_argument('--max', type=int, default=1000, help='Max results per query (NO LIMIT!)')
-    parser.add_argument('--no-contacts', action='store_true', help='Skip email/social extraction')
+    def __init__(self, page, recycle_after=RECYCLE_AFTER_CARDS, max_heap_mb=RECYCLE_HEAP_MB):
+        self.page = page
+        self.recycle_after = recycle_after
+        self.max_heap_mb = max_heap_mb
+        self.cards = 0
+        self.heap_mb = 0.0
+        self.recycled = 0
+        self.reason = ''
+        self._checked_at = 0
     
-    args = parser.parse_args()
+    @classmethod
+    async def open(cls, context, recycle_after=RECYCLE_AFTER_CARDS, max_heap_mb=RECYCLE_HEAP_MB):
+        return cls(await context.new_page(), recycle_after, max_heap_mb)
     
-    # Read queries
-    with open(args.queries, 'r', encoding='utf-8') as f:
-        queries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    async def needs_recycling(self):
+        if self.recycle_after and self.cards >= self.recycle_after:
+            self.reason = f"{self.cards} cards"
+            return True
+        if not self.max_heap_mb or self.cards - self._checked_at < RECYCLE_CHECK_EVERY:
+            return False
+        self._checked_at = self.cards
+        try:
+            self.heap_mb = await self.page.evaluate(JS_HEAP_JS) / (1024 * 1024)
+        except Exception:
+            return False
+        self.reason = f"{self.heap_mb:.0f} MB JS heap"
+        return self.heap_mb > self.max_heap_mb
     
-    print("="*60)
+    async def recycle(self):
+        """Open the replacement page before closing the old one, and return it"""
+        
+        page = await self.page.context.new_page()
+        await self.page.close()
+        self.page = page
+        self.cards = 0
+        self._checked_at = 0
+        self.recycled += 1
+        METRICS.count('pages_recycled')
+        return page
+    
+    async def close(self):
+        await self.page.close()
+
+async def open_search(page, query, wait_mode='adaptive', search_url=MAPS_SEARCH_URL):
+    """Load the search page (accepting the consent dialog) - False if no results feed appears"""
+    
+    # Go to Google Maps
+    with METRICS.time('maps_navigation'):
+        await page.goto(search_url.format(query=query.replace(' ', '+')))
+        await wait_step(page, 'search', wait_mode, selector=f'[role="feed"], {CONSENT_SELECTOR}')
+    
+    # Handle consent if it appears
+    try:
+        consent = page.locator(CONSENT_SELECTOR).first
+        if await consent.count() > 0:
+            with METRICS.time('consent'):
+                await consent.click()
+                await wait_step(page, 'consent', wait_mode, selector='[role="feed"]')
+    except Exception:
+        pass
+    
+    # Wait for results
+    try:
+        await page.wait_for_selector('[role="feed"]', timeout=10000)
+    except Exception as e:
+        METRICS.error('maps_navigation', e)
+        if await search_blocked(page):
+            METRICS.count('searches_blocked')
+        return False
+    return True
+
+async def search_blocked(page):
+    """True if Google answered with a captcha, or the consent wall wouldn't go away"""
+    
+    try:
+        if '/sorry/' in page.url:
+            return True
+        return await page.locator(f'{CAPTCHA_SELECTOR}, {CONSENT_SELECTOR}').count() > 0
+    except Exception:
+        return False
+
+async def iter_google_maps_search(page, query, max_results=1000, wait_mode='adaptive', index=None,
+                                  search_url=MAPS_SEARCH_URL, mode='detail', require_fields=None):
+    """
+    Scrape Google Maps search results, yielding each business as soon as
+    its details are extracted
+    NO LIMIT - scrape as many as you want!
+    
+    page: a Playwright page, or a MapsTab to have the page replaced by a
+        fresh one (same query, back at the same point in the feed) once it
+        has used too much memory
+    wait_mode: 'adaptive' waits for the page to react, 'sleep' uses fixed delays
+    index: a BusinessIndex shared across queries - cards already scraped are
+        skipped before clicking and only get this query added to their 'queries'
+    search_url: search page template with a {query} placeholder
+    mode: 'detail' clicks every card, 'list' reads everything from the feed
+        cards without clicking, 'hybrid' reads the cards and only clicks
+        those missing one of require_fields (default: phone and website)
+    """
+    
+    tab = page if isinstance(page, MapsTab) else None
+    if tab is not None:
+        page = tab.page
+    if require_fields is None:
+        require_fields = HYBRID_REQUIRED_FIELDS
+    
+    print(f"\n{'='*60}")
+    print(f"🔍 Query: {query}")
+    print(f"📊 Target: {max_results} results")
+    print(f"{'='*60}")
+    
+    if not await open_search(page, query, wait_mode, search_url):
+        print("❌ No results found!")
+        return
+    
+    # Scroll to load ALL results, working through new cards as they appear
+    print("📜 Scrolling to load results...")
+    
+    last_height = 0
+    no_change_count = 0
+    harvested = 0
+    extracted = 0
+    skipped = 0
+    lost = 0
+    transfer = {'bytes': 0, 'peak': 0}
+    
+    # Feed keys of every card handed out so far - a recycled page starts
+    # from these so it doesn't hand them out again
+    seen_keys = []
+    
+    # The current h1 tells the adaptive wait when the detail pane has
+    # switched to the clicked card
+    previous_title = await page.evaluate(H1_TEXT_JS) if wait_mode == 'adaptive' else ''
+    
+    while True:
+        # Swap a bloated page for a fresh one and scroll back down
+        if tab is not None and await tab.needs_recycling():
+            print(f"   ♻️  Recycling the Maps page ({tab.reason})")
+            page = await tab.recycle()
+            if not await open_search(page, query, wait_mode, search_url):
+                print("❌ Search didn't come back after recycling the page")
+                break
+            await page.evaluate(SEED_KEYS_JS, seen_keys)
+            previous_title = await page.evaluate(H1_TEXT_JS) if wait_mode == 'adaptive' else ''
+            last_height = 0
+            no_change_count = 0
+        
+        # Tag the cards that appeared since the last look - one round-trip,
+        # however long the feed has grown
+        fresh = await page.evaluate(HARVEST_CARDS_JS, [max_results - harvested, mode != 'detail'])
+        
+        for info in fresh:
+            harvested += 1
+            idx = harvested
+            seen_keys.append(info['href'] or info['label'])
+            if tab is not None:
+                tab.cards += 1
+            # True while this card holds its place key in the index without
+            # having handed a business out
+            claimed = False
+            try:
+                place = place_key(info['href'])
+                
+                # Seen in an earlier query (or being clicked by another tab) - skip the click
+                queries = [query]
+                if index is not None and place:
+                    if not index.merge([place], queries):
+                        skipped += 1
+                        continue
+                    claimed = True
+                
+                # List mode - the card has all we need
+                if mode != 'detail':
+                    with METRICS.time('card_parse'):
+                        business = parse_feed_card(info, query)
+                    if mode == 'list' or all(business.get(field) for field in require_fields):
+                        business['queries'] = queries
+                        if index is not None and not index.merge([place, business_identity(business)], queries):
+                            skipped += 1
+                            continue
+                        extracted += 1
+                        METRICS.count('businesses_from_card')
+                        claimed = False
+                        yield business
+                        continue
+                
+                # The feed may have recycled the node since it was tagged
+                card = page.locator(f'[role="article"][data-gms-seq="{info["seq"]}"]')
+                if await card.count() == 0:
+                    lost += 1
+                    continue
+                
+                # Click card to show details
+                with METRICS.time('card_click'):
+                    await card.first.click()
+                    await wait_step(page, 'card', wait_mode, DETAIL_READY_JS,
+                                    [info['label'], previous_title, place_id(info['href'])])
+                
+                # Extract ALL data in one round-trip
+                with METRICS.time('detail_extraction'):
+                    pane = await page.evaluate(DETAIL_PANE_JS)
+                    business = parse_detail_pane(pane, query)
+                business['place_url'] = info['href']
+                business['queries'] = queries
+                previous_title = business['title'].strip()
+                
+                # No place link to go on - the same name/address/phone is a duplicate
+                if index is not None and not index.merge([place, business_identity(business)], queries):
+                    skipped += 1
+                    continue
+                
+                card_bytes = payload_size(pane)
+                transfer['bytes'] += card_bytes
+                transfer['peak'] = max(transfer['peak'], card_bytes)
+                
+                extracted += 1
+                METRICS.count('businesses_extracted')
+                claimed = False
+                yield business
+                
+                if idx % 10 == 0:
+                    print(f"   Extracted {idx}/{max_results}")
+                
+            except Exception as e:
+                print(f"   ⚠️  Error on card {idx}: {str(e)}")
+                continue
+            finally:
+                # Lost or failed card - let a later query (or tab) try it again
+                if claimed:
+                    index.release([place], queries)
+        
+        if harvested >= max_results or no_change_count >= 5:
+            break
+        
+        # Scroll, then wait for the feed to load more cards
+        with METRICS.time('scroll'):
+            before = await page.evaluate(SCROLL_FEED_JS)
+            await wait_step(page, 'scroll', wait_mode, FEED_GREW_JS, [before['count'], before['height']])
+            
+            # Check if we reached the end
+            current_height = await page.evaluate(FEED_HEIGHT_JS)
+        
+        if current_height == last_height:
+            no_change_count += 1
+        else:
+            no_change_count = 0
+            last_height = current_height
+    
+    print(f"✅ Total cards found: {harvested}")
+    METRICS.count('cards_found', harvested)
+    if lost:
+        METRICS.count('cards_lost', lost)
+        print(f"   ⚠️  {lost} cards disappeared from the feed before they could be clicked")
+    
+    print(f"✅ Extracted {extracted} businesses")
+    METRICS.count('duplicates_skipped', skipped)
+    if skipped:
+        print(f"♻️  Skipped {skipped} businesses already scraped by another query")
+    if extracted:
+        print(f"📦 Transfer per card: {transfer['bytes'] / extracted / 1024:.1f} KB avg, "
+              f"{transfer['peak'] / 1024:.1f} KB peak")
+
+async def scrape_google_maps_search(page, query, max_results=1000, wait_mode='adaptive', index=None,
+                                    search_url=MAPS_SEARCH_URL, mode='detail', require_fields=None):
+    """
+    Scrape Google Maps search results
+    NO LIMIT - scrape as many as you want!
+    """
+    
+    return [business async for business in iter_google_maps_search(page, query, max_results, wait_mode, index,
+                                                                   search_url, mode, require_fields)]
+
+# ============================================================================
+# CONTACT CACHE
+# ============================================================================
+
+DEFAULT_CACHE_DIR = '.gmaps_cache'
+
+class ContactCache:
+    """
+    Persistent website -> contacts cache in SQLite, so repeat runs skip sites
+    that were crawled recently. Entries older than ttl_days are crawled
+    again; beyond max_entries the least recently fetched sites are evicted.
+    With refresh=True nothing is read but fresh results are still stored.
+    """
+    
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl_days=30, max_entries=200000, refresh=False):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'contacts.sqlite3')
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        
+        # Shard processes (--processes) share the file - wait for their writes
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute(f"""
+            CREATE TABLE IF NOT EXISTS contacts (
+                site TEXT PRIMARY KEY,
+                fetched_at REAL NOT NULL,
+                {', '.join(f'{field} TEXT' for field in CONTACT_FIELDS)}
+            )
+        """)
+        self.db.execute('CREATE INDEX IF NOT EXISTS contacts_fetched_at ON contacts (fetched_at)')
+        self.db.commit()
+    
+    def get(self, website):
+        """Cached contacts for a website, or None if missing/expired"""
+        
+        if self.refresh:
+            self.misses += 1
+            return None
+        
+        row = self.db.execute(
+            f"SELECT {', '.join(CONTACT_FIELDS)} FROM contacts WHERE site = ? AND fetched_at >= ?",
+            (normalize_website(website), time.time() - self.ttl),
+        ).fetchone()
+        
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(zip(CONTACT_FIELDS, (value or '' for value in row)))
+    
+    def put(self, website, contacts):
+        self.db.execute(
+            f"INSERT OR REPLACE INTO contacts (site, fetched_at, {', '.join(CONTACT_FIELDS)}) "
+            f"VALUES (?, ?, {', '.join('?' for _ in CONTACT_FIELDS)})",
+            (normalize_website(website), time.time(), *(contacts.get(field, '') for field in CONTACT_FIELDS)),
+        )
+        self.db.commit()
+        
+        self._writes += 1
+        if self._writes % 500 == 0:
+            self.evict()
+    
+    def evict(self):
+        """Drop the oldest entries once the cache grows past max_entries"""
+        
+        (count,) = self.db.execute('SELECT COUNT(*) FROM contacts').fetchone()
+        if count > self.max_entries:
+            self.db.execute(
+                'DELETE FROM contacts WHERE site IN (SELECT site FROM contacts ORDER BY fetched_at LIMIT ?)',
+                (count - self.max_entries,),
+            )
+            self.db.commit()
+    
+    def close(self):
+        self.evict()
+        self.db.close()
+
+# ============================================================================
+# WEBSITE SCRAPER (EMAILS + SOCIALS)
+# ============================================================================
+
+CONTACT_ENGINES = ['http', 'browser']
+
+# Pages with less visible text than this (or no links at all) are treated as
+# JavaScript-rendered shells and re-fetched in a browser
+MIN_STATIC_WORDS = 30
+
+# Cap on how much of a page the HTTP engine reads
+MAX_HTML_BYTES = 5 * 1024 * 1024
+
+# Keep-alive connections kept open per website host
+HTTP_CONNECTIONS_PER_HOST = 4
+
+FetchedPage = namedtuple('FetchedPage', ['url', 'status', 'html'])
+
+# Contact-page discovery: homepage links whose URL or text contains one of
+# these words are followed, best score first
+CONTACT_LINK_HINTS = [
+    ('contact', 3), ('kontakt', 3), ('impressum', 2), ('imprint', 2),
+    ('legal', 1), ('about', 1), ('team', 1),
+]
+
+# Guessed when the homepage links to nothing that looks like a contact page
+CONTACT_PATH_GUESSES = ['/contact', '/contact-us', '/about', '/about-us']
+
+# Contact pages fetched at once, and the time allowed for all of them (s)
+CONTACT_PAGE_CANDIDATES = 3
+CONTACT_PAGES_BUDGET = 6
+
+ANCHOR_PATTERN = re.compile(r'<a\s[^>]*?href\s*=\s*["\']?([^"\'\s>]+)[^>]*>(.*?)</a\s*>', re.IGNORECASE | re.DOTALL)
+
+def looks_js_rendered(html):
+    """Guess whether static HTML is an empty shell that needs a browser to render"""
+    
+    if not LINK_PATTERN.search(html):
+        return True
+    
+    body_start = html.lower().find('<body')
+    body = html[body_start:] if body_start >= 0 else html
+    text = TAG_PATTERN.sub(' ', SCRIPT_STYLE_PATTERN.sub(' ', body))
+    return len(text.split()) < MIN_STATIC_WORDS
+
+class PagePool:
+    """A fixed set of browser pages lent out to whoever needs one"""
+    
+    def __init__(self, pages):
+        self.pages = pages
+        self.closed = False
+        self._idle = asyncio.Queue()
+        for page in pages:
+            self._idle.put_nowait(page)
+    
+    @classmethod
+    async def open(cls, context, size):
+        return cls([await context.new_page() for _ in range(size)])
+    
+    @asynccontextmanager
+    async def page(self):
+        page = await self._idle.get()
+        try:
+            yield page
+        finally:
+            self._idle.put_nowait(page)
+    
+    async def close(self):
+        """Close every page - safe to call again, or after the browser is gone"""
+        
+        if self.closed:
+            return
+        self.closed = True
+        for page in self.pages:
+            try:
+                await page.close()
+            except Exception:
+                pass
+
+class BrowserFetcher:
+    """Load website pages in a Playwright tab"""
+    
+    def __init__(self, page, wait_mode='adaptive'):
+        self.page = page
+        self.wait_mode = wait_mode
+    
+    async def fetch(self, url, timeout, contact_page=False):
+        """Navigate to url (timeout in ms) and return the rendered HTML"""
+        
+        # Contact pages used to wait for the full load event
+        wait_until = 'load' if contact_page and self.wait_mode == 'sleep' else 'domcontentloaded'
+        response = await self.page.goto(url, timeout=timeout, wait_until=wait_until)
+        await wait_step(self.page, 'contact_page' if contact_page else 'website', self.wait_mode)
+        
+        return FetchedPage(self.page.url, response.status if response else 0, await self.page.content())
+
+class HttpFetcher:
+    """
+    Fetch website pages over a pooled keep-alive HTTP session. Pages that
+    look JavaScript-rendered or are blocked for non-browsers get a second
+    try in a browser page borrowed from page_pool.
+    """
+    
+    def __init__(self, session, page_pool=None, wait_mode='adaptive'):
+        self.session = session
+        self.page_pool = page_pool
+        self.wait_mode = wait_mode
+        self.browser_fallbacks = 0
+    
+    @classmethod
+    def create_session(cls, max_connections):
+        connector = aiohttp.TCPConnector(
+            limit=max_connections,
+            limit_per_host=HTTP_CONNECTIONS_PER_HOST,
+            ttl_dns_cache=300,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers={
+                'User-Agent': USER_AGENT,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'en-GB,en;q=0.9',
+            },
+        )
+    
+    async def fetch(self, url, timeout, contact_page=False):
+        """GET url (timeout in ms), falling back to a browser when needed"""
+        
+        async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=timeout / 1000)) as response:
+            status = response.status
+            final_url = str(response.url)
+            is_html = 'html' in response.headers.get('Content-Type', 'text/html').lower()
+            html = ""
+            if is_html:
+                # content.read(n) returns whatever is buffered - keep reading to
+                # the end of the body (or the cap) so footers aren't cut off
+                body = bytearray()
+                async for chunk in response.content.iter_any():
+                    body += chunk
+                    if len(body) >= MAX_HTML_BYTES:
+                        break
+                html = bytes(body[:MAX_HTML_BYTES]).decode(response.charset or 'utf-8', errors='replace')
+        
+        # 403/429/503 usually means bot protection - a real browser may get through
+        blocked = status in (403, 429, 503)
+        if self.page_pool and (blocked or (status < 400 and is_html and looks_js_rendered(html))):
+            self.browser_fallbacks += 1
+            METRICS.count('browser_fallbacks')
+            async with self.page_pool.page() as page:
+                return await BrowserFetcher(page, self.wait_mode).fetch(url, timeout, contact_page)
+        
+        return FetchedPage(final_url, status, html)
+
+def site_host(url):
+    """Host of a URL without 'www.', for telling same-site links apart"""
+    
+    host = urlsplit(url if '//' in url else f'//{url}').netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+def find_contact_links(html, base_url):
+    """
+    Look through a homepage's links for contact details.
+    Returns (emails from mailto: links, same-site URLs that look like
+    contact pages, best first).
+    """
+    
+    emails = []
+    scored = {}
+    host = site_host(base_url)
+    home = normalize_website(base_url)
+    
+    for position, (href, text) in enumerate(ANCHOR_PATTERN.findall(html)):
+        href = unescape(href)
+        if href.lower().startswith('mailto:'):
+            # Often entity- or percent-encoded, which the page scan misses
+            emails.extend(_scan_emails(unquote(href[7:].split('?')[0])))
+            continue
+        
+        label = f"{href} {TAG_PATTERN.sub(' ', text)}".lower()
+        score = max((points for hint, points in CONTACT_LINK_HINTS if hint in label), default=0)
+        if not score:
+            continue
+        
+        url = urljoin(base_url, href).split('#')[0]
+        if not url.startswith(('http://', 'https://')) or site_host(url) != host or normalize_website(url) == home:
+            continue
+        # Earlier links win ties - navigation comes before body text
+        scored.setdefault(url, (-score, position))
+    
+    return emails, sorted(scored, key=scored.get)
+
+async def fetch_contact_page_emails(fetcher, url, home):
+    """(emails, missing) for one contact page - missing means 404/410 or redirected to the homepage"""
+    
+    with METRICS.time('contact_page'):
+        page = await fetcher.fetch(url, 5000, contact_page=True)
+    missing = page.status in (404, 410) or normalize_website(page.url) == home
+    with METRICS.time('regex_extraction'):
+        emails = scan_contacts(page.html, socials=False).emails
+    return emails, missing
+
+async def crawl_website_contacts(fetcher, website, contacts, missing_paths=None):
+    """
+    Visit a business website (plus its contact pages when the homepage has
+    no email) and fill the CONTACT_FIELDS of contacts in place, so anything
+    found survives a time-budget cut-off. Raises if the homepage fails or
+    answers with an HTTP error status.
+    
+    Contact pages come from the homepage's own links (falling back to
+    CONTACT_PATH_GUESSES), up to CONTACT_PAGE_CANDIDATES at a time within
+    CONTACT_PAGES_BUDGET seconds, stopping at the first email. missing_paths
+    (host -> set of paths, shared by the run) remembers pages a site doesn't
+    have so they aren't tried again.
+    """
+    
+    # Get content
+    with METRICS.time('website_goto'):
+        homepage = await fetcher.fetch(website, 8000)
+    
+    # An error page (outage, 404, bot wall) says nothing about the site's
+    # contacts - failing here keeps it out of the cache
+    if homepage.status >= 400:
+        METRICS.count('websites_http_error')
+        raise RuntimeError(f"HTTP {homepage.status} from {website}")
+    
+    html = homepage.html
+    METRICS.count('websites_crawled')
+    
+    # Extract emails and socials
+    with METRICS.time('regex_extraction'):
+        emails, socials, _ = scan_contacts(html)
+    if emails:
+        contacts['email'] = emails[0]
+    
+    contacts['instagram'] = socials.get('instagram', '')
+    contacts['facebook'] = socials.get('facebook', '')
+    contacts['twitter'] = socials.get('twitter', '')
+    contacts['tiktok'] = socials.get('tiktok', '')
+    contacts['linkedin'] = socials.get('linkedin', '')
+    contacts['youtube'] = socials.get('youtube', '')
+    
+    if contacts.get('email'):
+        return
+    
+    base_url = homepage.url or website
+    mailto, candidates = find_contact_links(html, base_url)
+    if mailto:
+        contacts['email'] = mailto[0]
+        return
+    if not candidates:
+        candidates = [urljoin(base_url, path) for path in CONTACT_PATH_GUESSES]
+    
+    # Skip pages this site is already known not to have
+    home = normalize_website(base_url)
+    host = site_host(base_url)
+    missing = missing_paths.setdefault(host, set()) if missing_paths is not None else set()
+    candidates = [url for url in candidates if urlsplit(url).path not in missing][:CONTACT_PAGE_CANDIDATES]
+    
+    # A browser tab can only show one page at a time
+    concurrent = CONTACT_PAGE_CANDIDATES if isinstance(fetcher, HttpFetcher) else 1
+    pending = set()
+    deadline = time.monotonic() + CONTACT_PAGES_BUDGET
+    try:
+        while (candidates or pending) and not contacts.get('email'):
+            while candidates and len(pending) < concurrent:
+                url = candidates.pop(0)
+                task = asyncio.create_task(fetch_contact_page_emails(fetcher, url, home))
+                task.path = urlsplit(url).path
+                pending.add(task)
+            
+            done, pending = await asyncio.wait(pending, timeout=deadline - time.monotonic(),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                if task.exception() is not None:
+                    continue
+                emails, not_there = task.result()
+                if not_there:
+                    missing.add(task.path)
+                if emails and not contacts.get('email'):
+                    contacts['email'] = emails[0]
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def scrape_website_for_contacts(fetcher, business, wait_mode='adaptive', cache=None, missing_paths=None):
+    """
+    Extract emails and social media from business website
+    
+    fetcher is a BrowserFetcher / HttpFetcher, or a plain Playwright page.
+    With a ContactCache, fresh cached contacts are used instead of crawling
+    and new crawls are stored. missing_paths: see crawl_website_contacts.
+    """
+    
+    if not isinstance(fetcher, (BrowserFetcher, HttpFetcher)):
+        fetcher = BrowserFetcher(fetcher, wait_mode)
+    
+    website = business.get('website', '')
+    
+    if not website:
+        return business
+    
+    # Check if website IS social media
+    if 'instagram.com' in website:
+        business['instagram'] = website
+        return business
+    elif 'facebook.com' in website:
+        business['facebook'] = website
+        return business
+    elif 'tiktok.com' in website:
+        business['tiktok'] = website
+        return business
+    elif 'twitter.com' in website or 'x.com' in website:
+        business['twitter'] = website
+        return business
+    elif 'linkedin.com' in website:
+        business['linkedin'] = website
+        return business
+    
+    # Crawled recently?
+    cached = cache.get(website) if cache else None
+    if cached is not None:
+        METRICS.count('websites_from_cache')
+        business.update(cached)
+        return business
+    
+    # It's a real website - extract contacts
+    try:
+        await crawl_website_contacts(fetcher, website, business, missing_paths)
+    except Exception:
+        return business
+    
+    if cache:
+        cache.put(website, business)
+    
+    return business
+
+# ============================================================================
+# RESOURCE BLOCKING
+# ============================================================================
+
+# What each kind of page is allowed to download. Anything whose resource
+# type is not listed is aborted, as is any URL containing a deny pattern.
+RESOURCE_PROFILES = {
+    # Maps builds the feed and detail pane from its scripts + XHR; tiles,
+    # images, fonts and telemetry never feed a field we extract
+    'maps': {
+        'allow': ['document', 'script', 'xhr', 'fetch', 'stylesheet'],
+        'deny_urls': ['/maps/vt', '/kh/v=', 'khms', 'streetviewpixels', '/maps/preview/log',
+                      '/gen_204', 'google-analytics.com', 'googletagmanager.com', 'doubleclick.net'],
+    },
+    # Website pages are where JS-rendered sites go (the http engine's
+    # browser fallback, every site with the browser engine), so scripts and
+    # XHR must run for the contacts to appear; images, fonts, media and
+    # stylesheets never hold any
+    'website': {
+        'allow': ['document', 'script', 'xhr', 'fetch'],
+        'deny_urls': ['google-analytics.com', 'googletagmanager.com', 'doubleclick.net'],
+    },
+}
+
+RESOURCE_TYPES = ['document', 'stylesheet', 'image', 'media', 'font', 'script', 'texttrack',
+                  'xhr', 'fetch', 'eventsource', 'websocket', 'manifest', 'other']
+
+class ResourceRouter:
+    """
+    Aborts requests a browser context doesn't need (see RESOURCE_PROFILES)
+    and counts requests, blocks and downloaded bytes per resource type.
+    
+    rules override the profile: 'allow:<x>' / 'deny:<x>' where <x> is a
+    resource type (image, font, ...) or a URL substring. Allowed URLs win
+    over denied URLs, which win over the resource type.
+    
+    Note that Playwright turns off the HTTP cache for routed contexts.
+    """
+    
+    def __init__(self, profile, rules=None):
+        self.profile = profile
+        self.allow_types = set(RESOURCE_PROFILES[profile]['allow'])
+        self.deny_urls = list(RESOURCE_PROFILES[profile]['deny_urls'])
+        self.allow_urls = []
+        self.stats = {}
+        
+        for rule in rules or []:
+            action, _, target = rule.partition(':')
+            if action not in ('allow', 'deny') or not target:
+                raise ValueError(f"Bad resource rule '{rule}' - use allow:<type|url> or deny:<type|url>")
+            if target in RESOURCE_TYPES:
+                if action == 'allow':
+                    self.allow_types.add(target)
+                else:
+                    self.allow_types.discard(target)
+            elif action == 'allow':
+                self.allow_urls.append(target)
+            else:
+                self.deny_urls.append(target)
+    
+    async def install(self, context):
+        await context.route('**/*', self._handle_route)
+        context.on('requestfinished', self._count_bytes)
+        return self
+    
+    def allows(self, resource_type, url):
+        if any(pattern in url for pattern in self.allow_urls):
+            return True
+        if any(pattern in url for pattern in self.deny_urls):
+            return False
+        return resource_type in self.allow_types
+    
+    def _counter(self, resource_type):
+        return self.stats.setdefault(resource_type, {'requests': 0, 'blocked': 0, 'bytes': 0})
+    
+    async def _handle_route(self, route):
+        request = route.request
+        counter = self._counter(request.resource_type)
+        counter['requests'] += 1
+        
+        if self.allows(request.resource_type, request.url):
+            await route.continue_()
+        else:
+            counter['blocked'] += 1
+            await route.abort()
+    
+    async def _count_bytes(self, request):
+        try:
+            sizes = await request.sizes()
+            self._counter(request.resource_type)['bytes'] += sizes['responseBodySize'] + sizes['responseHeadersSize']
+        except Exception:
+            pass
+    
+    def print_report(self):
+        total = sum(c['requests'] for c in self.stats.values())
+        blocked = sum(c['blocked'] for c in self.stats.values())
+        downloaded = sum(c['bytes'] for c in self.stats.values())
+        
+        print(f"\n🚦 Requests ({self.profile}): {total} total, {blocked} blocked, "
+              f"{downloaded / 1024 / 1024:.1f} MB downloaded")
+        for resource_type, counter in sorted(self.stats.items(), key=lambda item: -item[1]['requests']):
+            print(f"   {resource_type:<12} {counter['requests']:6d} requests  "
+                  f"{counter['blocked']:6d} blocked  {counter['bytes'] / 1024:9.1f} KB")
+
+# ============================================================================
+# JOURNAL (CHECKPOINT / RESUME)
+# ============================================================================
+
+def record_key(business):
+    """Stable journal ID of a business record"""
+    return place_key(business.get('place_url', '')) or business_identity(business) or f"title:{business.get('title', '')}"
+
+class Journal:
+    """
+    Append-only JSONL log of a run. Every extracted business, every Phase 2
+    enrichment and every finished query is written (and flushed) the moment
+    it completes, so a crash or Ctrl-C loses at most the line in progress.
+    
+    With dedupe=False the same business found by two queries is kept twice,
+    so its ID includes the query.
+    """
+    
+    def __init__(self, path, resume=False, dedupe=True):
+        self.path = path
+        self.dedupe = dedupe
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+    
+    def key(self, business):
+        if self.dedupe:
+            return record_key(business)
+        return f"{record_key(business)}#{business.get('query', '')}"
+    
+    def _write(self, event):
+        self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self._file.flush()
+    
+    def business(self, business):
+        self._write({'type': 'business', 'id': self.key(business), 'record': business})
+    
+    def contacts(self, business):
+        fields = {field: business.get(field, '') for field in CONTACT_FIELDS}
+        self._write({'type': 'contacts', 'id': self.key(business), 'fields': fields})
+    
+    def query_done(self, query):
+        self._write({'type': 'query', 'query': query})
+    
+    def close(self):
+        self._file.close()
+
+def load_journal(path):
+    """
+    Rebuild the state of a run from its journal.
+    Returns (records by ID in extraction order, finished queries, IDs with contacts done).
+    """
+    
+    records = {}
+    done_queries = set()
+    enriched = set()
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # Torn last line from a crash
+                continue
+            
+            if event['type'] == 'business':
+                records.setdefault(event['id'], event['record'])
+            elif event['type'] == 'contacts':
+                if event['id'] in records:
+                    records[event['id']].update(event['fields'])
+                enriched.add(event['id'])
+            elif event['type'] == 'query':
+                done_queries.add(event['query'])
+    
+    return records, done_queries, enriched
+
+# ============================================================================
+# MAIN FUNCTION
+# ============================================================================
+
+# Businesses waiting for Phase 2 - a full queue pauses the Maps tabs until
+# the contact workers catch up
+CONTACT_QUEUE_SIZE = 100
+
+async def maps_worker(context, query_queue, total_queries, max_results, on_business,
+                      on_query_done=None, wait_mode='adaptive', index=None, mode='detail', require_fields=None,
+                      recycle_after=RECYCLE_AFTER_CARDS, recycle_heap_mb=RECYCLE_HEAP_MB, limiter=None):
+    """
+    Phase 1 worker - owns one Maps tab and pulls queries off the shared queue
+    until it is empty. Every business is passed to on_business(idx, business)
+    the moment it is extracted, so Phase 2 can start on it straight away.
+    The tab's page is recycled (see MapsTab) between and during queries, and
+    after a query fails in case the page crashed.
+    
+    limiter: an AdaptiveLimiter shared by the Maps workers - each query
+    needs one of its slots, and the time per business, failed queries and
+    blocked searches are reported to it. The tab is only opened once the
+    worker first gets a slot.
+    """
+    
+    tab = None
+    
+    try:
+        while True:
+            if limiter is not None:
+                await limiter.acquire()
+            try:
+                try:
+                    idx, query = query_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                
+                if tab is None:
+                    tab = await MapsTab.open(context, recycle_after, recycle_heap_mb)
+                
+                print(f"\n[{idx}/{total_queries}]")
+                try:
+                    if await tab.needs_recycling():
+                        await tab.recycle()
+                    found = 0
+                    started = time.perf_counter()
+                    async for business in iter_google_maps_search(tab, query, max_results, wait_mode, index,
+                                                                  mode=mode, require_fields=require_fields):
+                        found += 1
+                        if limiter is not None:
+                            limiter.record(time.perf_counter() - started)
+                        await on_business(idx, business)
+                        # Waiting on Phase 2 isn't Maps latency
+                        started = time.perf_counter()
+                    
+                    if limiter is not None and not found and await search_blocked(tab.page):
+                        limiter.record(blocked=True)
+                    if on_query_done is not None:
+                        on_query_done(query)
+                except Exception as e:
+                    print(f"   ⚠️  Error on query '{query}': {str(e)}")
+                    if limiter is not None:
+                        limiter.record(failed=True)
+                    try:
+                        await tab.recycle()
+                    except Exception:
+                        pass
+            finally:
+                if limiter is not None:
+                    limiter.release()
+    finally:
+        if tab is not None:
+            await tab.close()
+
+async def contact_worker(fetcher, contact_queue, progress, time_budget=None, cache=None, site_crawls=None,
+                         on_enriched=None, missing_paths=None, limiter=None):
+    """
+    Phase 2 worker - enriches businesses from the queue with its fetcher
+    until it receives the None sentinel. A website that exceeds time_budget
+    (seconds) is abandoned so it can't hog the worker; whatever was found
+    before the cut-off is kept. on_enriched(business) is called once a
+    business has its contacts.
+    
+    site_crawls (shared by all workers) maps normalised websites to a future
+    of their contacts: chains and shared domains are crawled once per run,
+    and a business whose site is already being crawled just gets a copy of
+    the result when that crawl finishes. missing_paths (also shared) holds
+    the contact pages each site turned out not to have.
+    
+    limiter: an AdaptiveLimiter shared by the contact workers - each crawl
+    needs one of its slots and reports its time (or timeout) to it.
+    """
+    
+    if site_crawls is None:
+        site_crawls = {}
+    
+    def finish(business):
+        if on_enriched is not None:
+            on_enriched(business)
+    
+    def copy_contacts(crawl, business):
+        if crawl.cancelled():
+            # The run was stopped - the business goes out without contacts
+            return
+        business.update(crawl.result())
+        finish(business)
+    
+    while True:
+        business = await contact_queue.get()
+        if business is None:
+            break
+        
+        key = normalize_website(business['website'])
+        crawl = site_crawls.get(key)
+        if crawl is not None:
+            progress['shared'] += 1
+            if crawl.done():
+                copy_contacts(crawl, business)
+            else:
+                crawl.add_done_callback(lambda done, business=business: copy_contacts(done, business))
+            continue
+        
+        crawl = asyncio.get_running_loop().create_future()
+        site_crawls[key] = crawl
+        try:
+            if limiter is not None:
+                await limiter.acquire()
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(scrape_website_for_contacts(fetcher, business, cache=cache,
+                                                                   missing_paths=missing_paths), time_budget)
+                if limiter is not None:
+                    limiter.record(time.perf_counter() - started)
+            finally:
+                if limiter is not None:
+                    limiter.release()
+        except asyncio.TimeoutError:
+            progress['timed_out'] += 1
+            METRICS.count('websites_timed_out')
+            if limiter is not None:
+                limiter.record(failed=True)
+        except Exception as e:
+            print(f"   ⚠️  Error on website {business.get('website')}: {str(e)}")
+            if limiter is not None:
+                limiter.record(failed=True)
+        except asyncio.CancelledError:
+            # Stopped mid-crawl: not finished, so a resumed run crawls it again
+            crawl.cancel()
+            raise
+        
+        crawl.set_result({field: business.get(field, '') for field in CONTACT_FIELDS})
+        finish(business)
+        
+        progress['done'] += 1
+        if progress['done'] % 30 == 0:
+            print(f"   📊 Contacts: {progress['done']} websites done")
+
+async def scrape_all(queries, max_results_per_query=1000, extract_contacts=True, maps_tabs=1,
+                     contact_workers=3, contact_timeout=30, wait_mode='adaptive',
+                     contact_engine='http', http_workers=100,
+                     block_resources=True, resource_rules=None,
+                     cache_dir=DEFAULT_CACHE_DIR, cache_ttl_days=30, refresh_contacts=False,
+                     dedupe=True, journal_path=None, resume=False, writer=None,
+                     metrics_json=None, metrics_prom=None, metrics_interval=15,
+                     mode='detail', require_fields=None,
+                     recycle_after=RECYCLE_AFTER_CARDS, recycle_heap_mb=RECYCLE_HEAP_MB, progress=None,
+                     adaptive=False, min_maps_tabs=1, min_contact_workers=1):
+    """
+    Main scraping function
+    NO LIMITS - scrape as much as you need!
+    
+    maps_tabs: number of Google Maps tabs scraping queries in parallel
+    contact_workers: number of browser pages visiting business websites in
+        parallel (with the http engine they only handle JS-rendered sites)
+    contact_timeout: time budget in seconds per business website
+    wait_mode: 'adaptive' (wait for the page to react) or 'sleep' (fixed delays)
+    contact_engine: 'http' (pooled HTTP requests, browser fallback - needs
+        aiohttp) or 'browser' (every website in a browser tab)
+    http_workers: websites fetched in parallel by the http engine
+    block_resources: abort downloads the scraper doesn't need (RESOURCE_PROFILES)
+    resource_rules: overrides for the blocking profiles, e.g. ['allow:image', 'deny:hotjar.com']
+    cache_dir: where the website contact cache lives (None disables it)
+    cache_ttl_days: how long cached contacts are trusted
+    refresh_contacts: crawl every website again, ignoring the cache
+    dedupe: scrape each business once even if several queries return it
+        (its 'queries' field lists all of them)
+    journal_path: append-only JSONL journal of everything scraped (None = off)
+    resume: continue the run recorded in journal_path - finished queries are
+        skipped, restored businesses aren't scraped again and only those still
+        missing their contacts go through Phase 2
+    writer: a ResultWriter (or anything with write(record)) fed each business
+        once it is final. Results are then streamed instead of kept in
+        memory, and scrape_all returns an empty list.
+    metrics_json: where the run's METRICS are saved as JSON at the end
+    metrics_prom: Prometheus text file rewritten every metrics_interval
+        seconds while the run goes
+    mode / require_fields: how much to click on Maps (SCRAPE_MODES), see
+        iter_google_maps_search
+    recycle_after / recycle_heap_mb: replace a Maps tab's page after this
+        many cards or above this JS heap size (0 = never), see MapsTab
+    progress: called with a dict for each finished query
+        ({'type': 'query_done', ...}) and when Phase 2 takes over
+        ({'type': 'phase', ...})
+    adaptive: size both worker pools with an AdaptiveLimiter instead of
+        running all of them - maps_tabs and contact_workers (http_workers
+        for the http engine) become the maximums, min_maps_tabs and
+        min_contact_workers the minimums
+    
+    Phase 2 (contacts) runs alongside Phase 1: every business with a website
+    is queued for contact extraction the moment it comes off Google Maps.
+    """
+    
+    all_results = []
+    counts = {'scraped': 0, 'websites': 0, 'queries': 0}
+    contact_tasks = []
+    limiters = []
+    page_pool = None
+    http_session = None
+    
+    # Businesses handed to Phase 2 that haven't reached the writer yet -
+    # written as they are if the run stops early
+    awaiting_contacts = {}
+    
+    def emit(business):
+        awaiting_contacts.pop(id(business), None)
+        if writer is not None:
+            writer.write(business)
+    
+    # Restore a previous run
+    restored = {}
+    done_queries = set()
+    enriched = set()
+    if resume and journal_path and os.path.exists(journal_path):
+        restored, done_queries, enriched = load_journal(journal_path)
+        remaining = [q for q in queries if q not in done_queries]
+        print(f"\n⏭️  Resuming: {len(queries) - len(remaining)} queries done, "
+              f"{len(restored)} businesses restored")
+        queries = remaining
+        if writer is None:
+            all_results.extend(restored.values())
+    
+    journal = Journal(journal_path, resume=resume, dedupe=dedupe) if journal_path else None
+    
+    METRICS.reset()
+    exporter = asyncio.create_task(export_metrics(metrics_prom, metrics_interval)) if metrics_prom else None
+    
+    async def stop_contact_workers():
+        """Cancel the Phase 2 workers and close their pages and session - safe to repeat"""
+        
+        for task in contact_tasks:
+            task.cancel()
+        await asyncio.gather(*contact_tasks, return_exceptions=True)
+        if http_session is not None and not http_session.closed:
+            await http_session.close()
+        if page_pool is not None:
+            await page_pool.close()
+    
+    try:
+        async with async_playwright() as p:
+            try:
+                # Launch browser
+                browser = await p.chromium.launch(
+                    headless=True,
+                    args=['--no-sandbox', '--disable-dev-shm-usage']
+                )
+                
+                # Maps tabs and website pages get separate contexts so each can have
+                # its own resource-blocking profile
+                context = await browser.new_context(
+                    viewport={'width': 1920, 'height': 1080},
+                    user_agent=USER_AGENT
+                )
+                web_context = await browser.new_context(
+                    viewport={'width': 1920, 'height': 1080},
+                    user_agent=USER_AGENT
+                )
+                
+                routers = []
+                if block_resources:
+                    routers = [
+                        await ResourceRouter('maps', resource_rules).install(context),
+                        await ResourceRouter('website', resource_rules).install(web_context),
+                    ]
+                
+                # Phase 2 consumers start first so they pick up businesses right away
+                contact_queue = None
+                contact_tasks = []
+                contact_progress = {'done': 0, 'timed_out': 0, 'shared': 0}
+                site_crawls = {}
+                missing_paths = {}
+                http_fetcher = None
+                cache = None
+                if extract_contacts:
+                    if cache_dir:
+                        cache = ContactCache(cache_dir, cache_ttl_days, refresh=refresh_contacts)
+                    
+                    if contact_engine == 'http' and aiohttp is None:
+                        print("⚠️  aiohttp not installed - loading websites in the browser (pip install aiohttp)")
+                        contact_engine = 'browser'
+                    
+                    page_pool = await PagePool.open(web_context, max(1, contact_workers))
+                    if contact_engine == 'http':
+                        # Many cheap HTTP workers share one keep-alive session; the
+                        # browser pages are only borrowed for JS-rendered sites
+                        http_session = HttpFetcher.create_session(http_workers)
+                        http_fetcher = HttpFetcher(http_session, page_pool, wait_mode)
+                        fetchers = [http_fetcher] * max(1, http_workers)
+                    else:
+                        fetchers = [BrowserFetcher(page, wait_mode) for page in page_pool.pages]
+                    
+                    def on_enriched(business):
+                        if journal is not None:
+                            journal.contacts(business)
+                        emit(business)
+                    
+                    contact_limiter = None
+                    if adaptive:
+                        contact_limiter = AdaptiveLimiter('contact_workers', min_contact_workers, len(fetchers))
+                        limiters.append(contact_limiter)
+                    
+                    contact_queue = asyncio.Queue(maxsize=CONTACT_QUEUE_SIZE)
+                    contact_tasks = [
+                        asyncio.create_task(contact_worker(fetcher, contact_queue, contact_progress, contact_timeout,
+                                                           cache, site_crawls, on_enriched, missing_paths,
+                                                           contact_limiter))
+                        for fetcher in fetchers
+                    ]
+                
+                # Phase 1: Scrape Google Maps
+                print("\n" + "="*60)
+                print("📍 PHASE 1: GOOGLE MAPS SCRAPING")
+                if extract_contacts:
+                    print(f"📧 + EMAIL & SOCIAL MEDIA EXTRACTION (running alongside, {'up to ' if adaptive else ''}{len(contact_tasks)} {contact_engine} workers)")
+                print("="*60)
+                
+                # Every tab pulls from the same queue, so a slow query only holds up its own tab
+                maps_tabs = max(1, min(maps_tabs, len(queries)))
+                maps_limiter = None
+                if adaptive:
+                    maps_limiter = AdaptiveLimiter('maps_tabs', min_maps_tabs, maps_tabs)
+                    limiters.append(maps_limiter)
+                    print(f"🗂️  Maps tabs: {maps_limiter.minimum}-{maps_tabs} (adaptive)")
+                else:
+                    print(f"🗂️  Maps tabs: {maps_tabs}")
+                
+                query_queue = asyncio.Queue()
+                for idx, query in enumerate(queries, 1):
+                    query_queue.put_nowait((idx, query))
+                
+                index = BusinessIndex() if dedupe else None
+                # The writer catches up on queries that find businesses it already wrote
+                if index is not None and hasattr(writer, 'late_queries'):
+                    writer.late_queries.index = index
+                if index is not None:
+                    for record in restored.values():
+                        index.merge([place_key(record.get('place_url', '')), business_identity(record)],
+                                    record.setdefault('queries', [record.get('query', '')]))
+                
+                # Restored businesses that never got their contacts go first
+                pending = [
+                    record for key, record in restored.items()
+                    if key not in enriched and record.get('website')
+                ] if extract_contacts else []
+                if pending:
+                    print(f"📧 {len(pending)} restored businesses still need contacts")
+                
+                # Restored businesses that are already complete go straight out
+                pending_ids = {id(record) for record in pending}
+                for record in restored.values():
+                    if id(record) not in pending_ids:
+                        emit(record)
+                
+                async def hand_over(business):
+                    counts['websites'] += 1
+                    awaiting_contacts[id(business)] = business
+                    await contact_queue.put(business)
+                
+                async def requeue_pending():
+                    for record in pending:
+                        await hand_over(record)
+                
+                results_by_query = {}
+                
+                async def on_business(idx, business):
+                    # Without dedupe there is no index to skip what the journal
+                    # restored - the unfinished query finds those businesses again
+                    if not dedupe and restored and journal.key(business) in restored:
+                        return
+                    counts['scraped'] += 1
+                    if writer is None:
+                        results_by_query.setdefault(idx, []).append(business)
+                    if journal is not None:
+                        journal.business(business)
+                    if contact_queue is not None and business.get('website'):
+                        await hand_over(business)
+                    else:
+                        emit(business)
+                
+                def on_query_done(query):
+                    counts['queries'] += 1
+                    if journal is not None:
+                        journal.query_done(query)
+                    if progress is not None:
+                        progress({'type': 'query_done', 'query': query, 'done': counts['queries'], 'total': len(queries)})
+                
+                await asyncio.gather(requeue_pending(), *[
+                    maps_worker(context, query_queue, len(queries), max_results_per_query,
+                                on_business, on_query_done, wait_mode, index, mode, require_fields,
+                                recycle_after, recycle_heap_mb, maps_limiter)
+                    for _ in range(maps_tabs)
+                ])
+                
+                # One sentinel per contact worker - they exit once the queue drains
+                for _ in contact_tasks:
+                    await contact_queue.put(None)
+                
+                # Keep the output in query order regardless of which tab finished first
+                for idx in sorted(results_by_query):
+                    all_results.extend(results_by_query[idx])
+                
+                print(f"\n{'='*60}")
+                print(f"✅ PHASE 1 COMPLETE: {counts['scraped']} businesses")
+                print(f"{'='*60}")
+                
+                # Phase 2: Finish contact extraction
+                if extract_contacts:
+                    if progress is not None:
+                        progress({'type': 'phase', 'phase': 'contacts', 'queued': contact_queue.qsize()})
+                    print("\n" + "="*60)
+                    print("📧 PHASE 2: EMAIL & SOCIAL MEDIA EXTRACTION")
+                    print("="*60)
+                    
+                    print(f"\n🌐 {counts['websites']} businesses have websites")
+                    print(f"   ⏳ {contact_queue.qsize()} websites still queued...")
+                    
+                    await asyncio.gather(*contact_tasks)
+                    
+                    await page_pool.close()
+                    if http_session is not None:
+                        await http_session.close()
+                    
+                    if contact_progress['shared']:
+                        print(f"   🔗 {contact_progress['shared']} businesses shared a website already crawled this run")
+                    if contact_progress['timed_out']:
+                        print(f"   ⏱️  {contact_progress['timed_out']} websites hit the {contact_timeout}s time budget")
+                    if cache is not None:
+                        cache.close()
+                        print(f"   🗄️  Contact cache: {cache.hits} hits, {cache.misses} misses")
+                    if http_fetcher is not None and http_fetcher.browser_fallbacks:
+                        print(f"   🖥️  {http_fetcher.browser_fallbacks} pages needed the browser (JS-rendered or blocked)")
+                    print(f"\n✅ PHASE 2 COMPLETE!")
+                
+                for router in routers:
+                    router.print_report()
+                for limiter in limiters:
+                    limiter.print_report()
+                
+                await browser.close()
+            finally:
+                # Stop the contact workers while the browser is still up - once it
+                # closes every page they try fails, and the sites would be
+                # journalled as done with no contacts
+                await stop_contact_workers()
+    finally:
+        # Stopped early (Ctrl-C, cancel) - anything still waiting on Phase 2
+        # is written as it is, so an interrupted run keeps what it scraped
+        for business in list(awaiting_contacts.values()):
+            emit(business)
+        if journal is not None:
+            journal.close()
+        
+        if exporter is not None:
+            exporter.cancel()
+            await asyncio.gather(exporter, return_exceptions=True)
+            METRICS.write_prometheus(metrics_prom)
+        if metrics_json:
+            METRICS.save_json(metrics_json)
+        METRICS.print_report()
+    
+    return all_results
+
+# ============================================================================
+# SAVE FUNCTION
+# ============================================================================
+
+CSV_FIELDS = ['title', 'address', 'phone', 'website', 'email', 
+              'instagram', 'facebook', 'twitter', 'tiktok', 'linkedin', 'youtube',
+              'rating', 'reviews', 'category', 'query', 'queries', 'place_url']
+
+def csv_row(record):
+    """A business record as a CSV row - the queries list becomes 'a | b'"""
+    
+    queries = record.get('queries')
+    if isinstance(queries, list):
+        record = dict(record, queries=' | '.join(queries))
+    return record
+
+class LateQueries:
+    """
+    With dedupe, a business's 'queries' list keeps growing after its row is
+    written - later queries that find it are added by the BusinessIndex.
+    scrape_all points a writer's late_queries at its index, and the writer
+    catches up on the businesses the index reports, by record_key(). Nothing
+    is kept per row, and without dedupe there is no index to follow.
+    """
+    
+    def __init__(self):
+        self.index = None
+    
+    def grown(self):
+        """{record_key(): 'a | b'} for every business that gained a query since the last call"""
+        
+        return self.index.take_grown() if self.index is not None else {}
+
+class FillRates:
+    """Fill-rate reporting for anything with .total and a .filled count per CSV field"""
+    
+    def stats(self):
+        """Fill rates as a JSON-friendly dict"""
+        
+        total = self.total
+        return {
+            'total': total,
+            'fields': {
+                field: {
+                    'count': count,
+                    'percent': round(count * 100 / total, 1) if total else 0.0,
+                }
+                for field, count in self.filled.items()
+            },
+        }
+    
+    def save_stats(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.stats(), f, indent=2)
+    
+    def print_stats(self):
+        total = self.total
+        filled = self.filled
+        
+        print("\n" + "="*60)
+        print("📊 FINAL STATISTICS")
+        print("="*60)
+        print(f"Total businesses: {total}")
+        for label, field in [('phone', 'phone'), ('website', 'website'), ('email', 'email'),
+                             ('Instagram', 'instagram'), ('Facebook', 'facebook'), ('TikTok', 'tiktok')]:
+            count = filled[field]
+            print(f"{'With ' + label + ':':<16}{count:4d} ({count*100//total if total else 0:2d}%)")
+        print("="*60)
+
+class ResultWriter(FillRates):
+    """
+    Streams business records to a CSV file as they arrive and keeps a
+    fill-rate counter per field, so neither the file nor the statistics need
+    the whole result list in memory. Queries that found a business after
+    its row was written are filled in by close(), which rewrites the file
+    one row at a time.
+    """
+    
+    def __init__(self, filename):
+        self.filename = filename
+        self.total = 0
+        self.filled = dict.fromkeys(CSV_FIELDS, 0)
+        self.late_queries = LateQueries()
+        self._file = open(filename, 'w', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        self._writer.writeheader()
+    
+    def write(self, record):
+        row = csv_row(record)
+        self._writer.writerow(row)
+        self._file.flush()
+        
+        self.total += 1
+        for field in CSV_FIELDS:
+            if row.get(field):
+                self.filled[field] += 1
+    
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        
+        late = self.late_queries.grown()
+        if not late:
+            return
+        temp = f"{self.filename}.tmp"
+        with open(self.filename, 'r', encoding='utf-8', newline='') as source, \
+                open(temp, 'w', encoding='utf-8', newline='') as target:
+            writer = csv.DictWriter(target, fieldnames=CSV_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for row in csv.DictReader(source):
+                row['queries'] = late.get(record_key(row), row['queries'])
+                writer.writerow(row)
+        os.replace(temp, self.filename)
+
+# ============================================================================
+# RESULT STORE
+# ============================================================================
+
+EXPORT_FORMATS = {'csv': '.csv', 'jsonl': '.jsonl', 'parquet': '.parquet'}
+
+def export_format(path):
+    """Export format from a file extension ('csv' for anything unknown)"""
+    
+    extension = os.path.splitext(path)[1].lower()
+    return next((fmt for fmt, ext in EXPORT_FORMATS.items() if ext == extension), 'csv')
+
+class ResultStore(FillRates):
+    """
+    Business records in an indexed SQLite database, upserted by identity
+    (record_key(), plus the query when dedupe is False) - a business seen
+    again has its empty fields filled in and its queries merged instead of
+    being added twice. Works as a scrape_all writer.
+    
+    Exports (CSV, JSONL, Parquet with pyarrow) are streamed from the
+    database in chunks, never built in memory, and an export file is only
+    rewritten when the store changed since it was made.
+    
+    The connection may be used from several threads (one at a time).
+    """
+    
+    def __init__(self, path, dedupe=True, commit_every=200, commit_interval=2.0):
+        self.path = path
+        self.dedupe = dedupe
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.version = 0
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        self._exports = {}
+        self._filled = None
+        self.late_queries = LateQueries()
+        self._lock = threading.RLock()
+        
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute(f"""
+            CREATE TABLE IF NOT EXISTS businesses (
+                id TEXT PRIMARY KEY,
+                {', '.join(f"{field} TEXT NOT NULL DEFAULT ''" for field in CSV_FIELDS)},
+                has_email INTEGER NOT NULL DEFAULT 0,
+                has_phone INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Every query that found a business, not just the first one
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS business_queries (
+                query TEXT NOT NULL,
+                business_id TEXT NOT NULL,
+                PRIMARY KEY (query, business_id)
+            ) WITHOUT ROWID
+        """)
+        self.db.execute('CREATE INDEX IF NOT EXISTS businesses_query ON businesses (query)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS businesses_category ON businesses (category)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS businesses_has_email ON businesses (has_email)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS businesses_has_phone ON businesses (has_phone)')
+        self.db.commit()
+        
+        # Untouched fields keep their value, the rest take the new one
+        updates = ', '.join(
+            f"{field} = CASE WHEN excluded.{field} != '' THEN excluded.{field} ELSE businesses.{field} END"
+            for field in CSV_FIELDS if field not in ('query', 'queries')
+        )
+        self._upsert = (
+            f"INSERT INTO businesses (id, {', '.join(CSV_FIELDS)}, has_email, has_phone) "
+            f"VALUES ({', '.join('?' for _ in range(len(CSV_FIELDS) + 3))}) "
+            f"ON CONFLICT (id) DO UPDATE SET {updates}, queries = excluded.queries, "
+            f"has_email = businesses.has_email OR excluded.has_email, "
+            f"has_phone = businesses.has_phone OR excluded.has_phone"
+        )
+    
+    def key(self, business):
+        if self.dedupe:
+            return record_key(business)
+        return f"{record_key(business)}#{business.get('query', '')}"
+    
+    def write(self, record):
+        row = csv_row(record)
+        values = {field: '' if row.get(field) is None else str(row[field]) for field in CSV_FIELDS}
+        key = self.key(row)
+        queries = [q for q in values['queries'].split(' | ') if q] or ([values['query']] if values['query'] else [])
+        
+        with self._lock:
+            known = self.db.execute('SELECT queries FROM businesses WHERE id = ?', (key,)).fetchone()
+            if known is not None:
+                queries = [q for q in known[0].split(' | ') if q] + queries
+            values['queries'] = ' | '.join(dict.fromkeys(queries))
+            
+            self.db.execute(self._upsert, (key, *values.values(),
+                                           int(bool(values['email'].strip())), int(bool(values['phone'].strip()))))
+            self.db.executemany('INSERT OR IGNORE INTO business_queries (query, business_id) VALUES (?, ?)',
+                                [(query, key) for query in queries])
+            
+            self.version += 1
+            self._filled = None
+            self._pending += 1
+            if self._pending >= self.commit_every or time.monotonic() - self._last_commit >= self.commit_interval:
+                self.commit()
+    
+    def write_many(self, records):
+        with self._lock:
+            for record in records:
+                self.write(record)
+    
+    def commit(self):
+        with self._lock:
+            self.db.commit()
+            self._pending = 0
+            self._last_commit = time.monotonic()
+    
+    def catch_up_queries(self):
+        """Merge in the queries that found stored businesses after they were written"""
+        
+        with self._lock:
+            for key, queries in self.late_queries.grown().items():
+                known = self.db.execute('SELECT queries FROM businesses WHERE id = ?', (key,)).fetchone()
+                merged = [q for q in (known[0] if known else '').split(' | ') if q] + queries.split(' | ')
+                merged = list(dict.fromkeys(merged))
+                self.db.execute('UPDATE businesses SET queries = ? WHERE id = ?', (' | '.join(merged), key))
+                self.db.executemany('INSERT OR IGNORE INTO business_queries (query, business_id) VALUES (?, ?)',
+                                    [(query, key) for query in merged])
+                self.version += 1
+            self.commit()
+    
+    @property
+    def total(self):
+        with self._lock:
+            return self.db.execute('SELECT COUNT(*) FROM businesses').fetchone()[0]
+    
+    @property
+    def filled(self):
+        """Non-empty count per CSV field, one table scan per store version"""
+        
+        with self._lock:
+            if self._filled is None:
+                row = self.db.execute(
+                    'SELECT ' + ', '.join(f"COALESCE(SUM({field} != ''), 0)" for field in CSV_FIELDS) + ' FROM businesses'
+                ).fetchone()
+                self._filled = dict(zip(CSV_FIELDS, row))
+            return dict(self._filled)
+    
+    def _where(self, query=None, category=None, with_email=None, with_phone=None):
+        clauses, params = [], []
+        if query is not None:
+            clauses.append('id IN (SELECT business_id FROM business_queries WHERE query = ?)')
+            params.append(query)
+        if category is not None:
+            clauses.append('category = ?')
+            params.append(category)
+        if with_email is not None:
+            clauses.append('has_email = ?')
+            params.append(int(with_email))
+        if with_phone is not None:
+            clauses.append('has_phone = ?')
+            params.append(int(with_phone))
+        return clauses, params
+    
+    def count(self, **filters):
+        clauses, params = self._where(**filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        with self._lock:
+            return self.db.execute(f'SELECT COUNT(*) FROM businesses {where}', params).fetchone()[0]
+    
+    def iter_chunks(self, chunk_size=1000, **filters):
+        """
+        Yield lists of CSV rows (dicts) in the order businesses were first
+        stored, chunk_size at a time. filters: query, category, with_email,
+        with_phone. Paged by rowid, so writes in between are safe.
+        """
+        
+        clauses, params = self._where(**filters)
+        last = 0
+        while True:
+            where = ' AND '.join(['rowid > ?'] + clauses)
+            with self._lock:
+                rows = self.db.execute(
+                    f"SELECT rowid, {', '.join(CSV_FIELDS)} FROM businesses WHERE {where} ORDER BY rowid LIMIT ?",
+                    [last] + params + [chunk_size],
+                ).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield [dict(zip(CSV_FIELDS, row[1:])) for row in rows]
+    
+    def export_csv(self, path, **filters):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for chunk in self.iter_chunks(**filters):
+                writer.writerows(chunk)
+    
+    def export_jsonl(self, path, **filters):
+        with open(path, 'w', encoding='utf-8') as f:
+            for chunk in self.iter_chunks(**filters):
+                f.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in chunk)
+    
+    def export_parquet(self, path, **filters):
+        if pyarrow is None:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+        
+        schema = pyarrow.schema([(field, pyarrow.string()) for field in CSV_FIELDS])
+        with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+            for chunk in self.iter_chunks(chunk_size=10000, **filters):
+                writer.write_table(pyarrow.Table.from_pylist(chunk, schema=schema))
+    
+    def export(self, fmt='csv', path=None, **filters):
+        """
+        Write the store (or the filtered part of it) as csv, jsonl or parquet
+        and return the file path - by default next to the database. An
+        unfiltered export that is still current is not written again.
+        """
+        
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r} (choose from {', '.join(EXPORT_FORMATS)})")
+        if path is None:
+            path = os.path.splitext(self.path)[0] + EXPORT_FORMATS[fmt]
+        
+        with self._lock:
+            self.catch_up_queries()
+            if not filters and self._exports.get(path) == self.version and os.path.exists(path):
+                return path
+            version = self.version
+        
+        # Written aside and swapped in, so a reader never sees half a file
+        temp = f"{path}.tmp"
+        getattr(self, f'export_{fmt}')(temp, **filters)
+        os.replace(temp, path)
+        
+        if not filters:
+            self._exports[path] = version
+        return path
+    
+    def close(self):
+        with self._lock:
+            self.catch_up_queries()
+            self.db.close()
+
+def save_to_csv(results, filename):
+    """Save results to CSV"""
+    
+    if not results:
+        print("❌ No results to save!")
+        return
+    
+    # Every record as it is - nothing merged
+    writer = ResultWriter(filename)
+    for record in results:
+        writer.write(record)
+    writer.close()
+    
+    print(f"\n💾 Saved to: {filename}")
+    
+    writer.print_stats()
+    return writer
+
+# ============================================================================
+# BACKGROUND RUNS
+# ============================================================================
+
+class QueueWriter:
+    """
+    Writer for scrape_all that hands finished records to another thread in
+    batches: ('records', [...]) tuples on a queue.Queue, sent every
+    batch_size records or flush_every seconds, whichever comes first.
+    Queries that found an already sent business follow as
+    ('queries', {record_key(): 'a | b'}).
+    """
+    
+    def __init__(self, events, batch_size=25, flush_every=1.0):
+        self.events = events
+        self.batch_size = batch_size
+        self.flush_every = flush_every
+        self.total = 0
+        self._batch = []
+        self.late_queries = LateQueries()
+        self._last_flush = time.monotonic()
+    
+    def write(self, record):
+        self._batch.append(csv_row(record))
+        self.total += 1
+        if len(self._batch) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_every:
+            self.flush()
+    
+    def flush(self):
+        if self._batch:
+            self.events.put(('records', self._batch))
+            self._batch = []
+        late = self.late_queries.grown()
+        if late:
+            self.events.put(('queries', late))
+        self._last_flush = time.monotonic()
+
+class BackgroundScrape:
+    """
+    Runs scrape_all in a daemon thread with its own event loop, so a UI
+    (the Streamlit app) stays responsive. Everything comes back through
+    poll() as (kind, payload) events:
+    
+        ('records', [record, ...])  finished businesses, in batches
+        ('queries', {key: 'a | b'})  new 'queries' value of records
+                                    already sent, by record_key()
+        ('progress', {...})         scrape_all progress events
+        ('error', message)          the run failed
+        ('done', {'cancelled': bool, 'total': n, 'elapsed': s})   always last
+    
+    cancel() stops the run from any thread; businesses still waiting for
+    their contacts are flushed as they are before 'done'.
+    """
+    
+    def __init__(self, queries, **options):
+        self.queries = queries
+        self.options = options
+        self.events = queue.Queue()
+        self.writer = QueueWriter(self.events)
+        self.cancelled = False
+        self._loop = None
+        self._task = None
+        self._thread = threading.Thread(target=self._run, name='gmaps-background', daemon=True)
+    
+    def start(self):
+        self._thread.start()
+        return self
+    
+    @property
+    def running(self):
+        return self._thread.is_alive()
+    
+    def _run(self):
+        start = time.time()
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        try:
+            self._task = loop.create_task(scrape_all(
+                self.queries, writer=self.writer,
+                progress=lambda event: self.events.put(('progress', event)),
+                **self.options,
+            ))
+            if self.cancelled:
+                self._task.cancel()
+            loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.events.put(('error', str(e)))
+        finally:
+            # Like asyncio.run(): nothing may be left pending when the loop closes
+            leftovers = asyncio.all_tasks(loop)
+            for task in leftovers:
+                task.cancel()
+            if leftovers:
+                loop.run_until_complete(asyncio.gather(*leftovers, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            self.writer.flush()
+            loop.close()
+            self.events.put(('done', {'cancelled': self.cancelled, 'total': self.writer.total,
+                                      'elapsed': time.time() - start}))
+    
+    def cancel(self):
+        self.cancelled = True
+        if self._loop is not None and self._task is not None and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                # The loop closed in the meantime - the run already ended
+                pass
+    
+    def poll(self):
+        """Every event that arrived since the last poll"""
+        
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+# ============================================================================
+# MULTI-PROCESS SHARDING
+# ============================================================================
+
+def shard_queries(queries, processes):
+    """Split the queries round-robin into at most `processes` non-empty shards"""
+    
+    shards = [queries[i::processes] for i in range(max(1, processes))]
+    return [shard for shard in shards if shard]
+
+def shard_path(filename, shard_id, suffix):
+    """Per-shard file next to the output, e.g. results.shard2.csv"""
+    
+    return f"{os.path.splitext(filename)[0]}.shard{shard_id}{suffix}"
+
+class ShardWriter:
+    """ResultWriter for a shard process that also reports each row to the parent"""
+    
+    def __init__(self, writer, shard_id, events):
+        self.writer = writer
+        self.shard_id = shard_id
+        self.events = events
+    
+    def write(self, record):
+        self.writer.write(record)
+        self.events.put((self.shard_id, 'record'))
+
+def run_shard(shard_id, queries, filename, options, events):
+    """
+    Entry point of a shard process: its own event loop and browser, scraping
+    its share of the queries into <output>.shard<N>.csv. Its console output
+    goes to <output>.shard<N>.log so the parent can show a combined view.
+    """
+    
+    log = open(shard_path(filename, shard_id, '.log'), 'w', encoding='utf-8', buffering=1)
+    sys.stdout = sys.stderr = log
+    
+    writer = ResultWriter(shard_path(filename, shard_id, '.csv'))
+    try:
+        asyncio.run(scrape_all(queries, writer=ShardWriter(writer, shard_id, events), **options))
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted - partial results kept")
+    finally:
+        writer.close()
+        events.put((shard_id, 'done'))
+        log.close()
+
+def merge_shards(paths, filename, dedupe=True, store=None):
+    """
+    Merge shard CSVs into one output file, or into a ResultStore if one is
+    given. A business found by several shards is kept once with all of its
+    queries (unless dedupe is False). Returns the ResultWriter of the merged
+    file (or the store).
+    """
+    
+    records = []
+    index = BusinessIndex() if dedupe else None
+    
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for record in csv.DictReader(f):
+                record['queries'] = [q for q in record.get('queries', '').split(' | ') if q]
+                if index is None or index.merge([place_key(record.get('place_url', '')),
+                                                 business_identity(record)], record['queries']):
+                    records.append(record)
+    
+    if store is not None:
+        store.write_many(records)
+        store.commit()
+        return store
+    
+    writer = ResultWriter(filename)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    return writer
+
+def scrape_sharded(queries, filename, processes, options, journal_path=None, store=None):
+    """
+    Scrape with one process (and browser) per shard of the queries, then
+    merge the shard files into `filename`. Each shard journals to its own
+    file, so --resume works as long as the queries and process count stay
+    the same. Ctrl-C stops every shard; whatever they wrote is still merged.
+    
+    options: keyword arguments for scrape_all (writer, journal_path and the
+    metrics files are set per shard). The shards' metrics are merged into
+    options' metrics_json / metrics_prom at the end.
+    store: merge into this ResultStore instead of writing `filename`
+    """
+    
+    shards = shard_queries(queries, processes)
+    ctx = multiprocessing.get_context('spawn')
+    events = ctx.Queue()
+    
+    workers = []
+    for shard_id, shard in enumerate(shards, 1):
+        shard_options = dict(
+            options,
+            journal_path=shard_path(journal_path, shard_id, '.jsonl') if journal_path else None,
+            metrics_json=shard_path(filename, shard_id, '.metrics.json'),
+            metrics_prom=shard_path(options['metrics_prom'], shard_id, '.prom') if options.get('metrics_prom') else None,
+        )
+        worker = ctx.Process(target=run_shard, args=(shard_id, shard, filename, shard_options, events),
+                             name=f'gmaps-shard{shard_id}')
+        worker.start()
+        workers.append(worker)
+    
+    print(f"🧩 {len(workers)} processes - logs in {shard_path(filename, '*', '.log')}")
+    
+    written = dict.fromkeys(range(1, len(workers) + 1), 0)
+    finished = set()
+    last_report = time.time()
+    try:
+        while len(finished) < len(workers):
+            try:
+                shard_id, kind = events.get(timeout=1)
+                if kind == 'record':
+                    written[shard_id] += 1
+                else:
+                    finished.add(shard_id)
+                    print(f"   ✅ Shard {shard_id} finished ({written[shard_id]} businesses)")
+            except queue.Empty:
+                # A shard that died without reporting still counts as finished
+                finished.update(i for i, w in enumerate(workers, 1) if not w.is_alive())
+            
+            if time.time() - last_report >= 10:
+                last_report = time.time()
+                print(f"   📊 {sum(written.values())} businesses from {len(workers) - len(finished)} running shards")
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping - waiting for the shards to save their results...")
+    finally:
+        for worker in workers:
+            worker.join(timeout=60)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+    
+    print(f"\n🔗 Merging {len(workers)} shards...")
+    METRICS.reset()
+    for shard_id in range(1, len(workers) + 1):
+        path = shard_path(filename, shard_id, '.metrics.json')
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                METRICS.merge(json.load(f))
+    if options.get('metrics_json'):
+        METRICS.save_json(options['metrics_json'])
+    if options.get('metrics_prom'):
+        METRICS.write_prometheus(options['metrics_prom'])
+    METRICS.print_report()
+    
+    return merge_shards([shard_path(filename, i, '.csv') for i in range(1, len(workers) + 1)],
+                        filename, options.get('dedupe', True), store)
+
+# ============================================================================
+# CLI INTERFACE
+# ============================================================================
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Google Maps Scraper - NO LIMITS!')
+    parser.add_argument('--queries', required=True, help='Path to queries file')
+    parser.add_argument('--output', default='results.csv',
+                        help='Output file - .csv, .jsonl or .parquet (the last two are exported from --store)')
+    parser.add_argument('--store', help='SQLite result store that businesses are upserted into across runs '
+                                        '(default for .jsonl/.parquet output: <output>.sqlite3)')
+    parser.add_argument('--max', type=int, default=1000, help='Max results per query (NO LIMIT!)')
+    parser.add_argument('--no-contacts', action='store_true', help='Skip email/social extraction')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Worker processes, each with its own browser and a share of the queries')
+    parser.add_argument('--mode', choices=SCRAPE_MODES, default='detail',
+                        help='detail: click every card, list: feed cards only (fast), hybrid: click only cards missing --require fields')
+    parser.add_argument('--require', default=','.join(HYBRID_REQUIRED_FIELDS),
+                        help='Comma-separated fields that make hybrid mode click a card when the card lacks them')
+    parser.add_argument('--recycle-after', type=int, default=RECYCLE_AFTER_CARDS,
+                        help='Replace a Maps tab with a fresh one after this many cards (0 = never)')
+    parser.add_argument('--recycle-heap-mb', type=int, default=RECYCLE_HEAP_MB,
+                        help='Replace a Maps tab once its JavaScript heap passes this many MB (0 = never)')
+    parser.add_argument('--tabs', type=int, default=1, help='Google Maps tabs to scrape queries in parallel')
+    parser.add_argument('--contact-workers', type=int, default=3,
+                        help='Browser pages visiting business websites in parallel (http engine: JS-rendered sites only)')
+    parser.add_argument('--contact-engine', choices=CONTACT_ENGINES, default='http',
+                        help='http: fast pooled requests with browser fallback (needs aiohttp), browser: every site in a tab')
+    parser.add_argument('--http-workers', type=int, default=100, help='Websites fetched in parallel by the http engine')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Adjust Maps tabs and website workers to what the machine and Google sustain '
+                             '(--tabs, --contact-workers / --http-workers become the maximums)')
+    parser.add_argument('--min-tabs', type=int, default=1, help='Fewest Maps tabs with --adaptive')
+    parser.add_argument('--min-contact-workers', type=int, default=1, help='Fewest website workers with --adaptive')
+    parser.add_argument('--contact-timeout', type=float, default=30, help='Time budget in seconds per business website')
+    parser.add_argument('--stats-json', help='Fill-rate statistics file (default: <output>.stats.json)')
+    parser.add_argument('--metrics-json', help='Per-stage timings and error counts (default: <output>.metrics.json)')
+    parser.add_argument('--metrics-prom', help='Prometheus text file updated during the run (default: <output>.metrics.prom)')
+    parser.add_argument('--metrics-interval', type=float, default=15, help='Seconds between Prometheus file updates')
+    parser.add_argument('--journal', help='Checkpoint journal (default: <output>.journal.jsonl)')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted run from its journal')
+    parser.add_argument('--no-dedupe', action='store_true', help='Keep businesses that several queries return once per query')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Where website contacts are cached between runs')
+    parser.add_argument('--cache-ttl', type=float, default=30, help='Days before a cached website is crawled again')
+    parser.add_argument('--no-cache', action='store_true', help="Don't read or write the contact cache")
+    parser.add_argument('--refresh-contacts', action='store_true', help='Crawl every website again (cache is updated)')
+    parser.add_argument('--no-block', action='store_true', help="Don't block images, fonts, map tiles and trackers")
+    parser.add_argument('--allow-resource', action='append', default=[], metavar='TYPE_OR_URL',
+                        help='Let a resource type (image, font, ...) or URL substring through (repeatable)')
+    parser.add_argument('--block-resource', action='append', default=[], metavar='TYPE_OR_URL',
+                        help='Block a resource type or URL substring (repeatable)')
+    parser.add_argument('--wait-mode', choices=WAIT_MODES, default='adaptive',
+                        help='adaptive: wait for the page to react, sleep: fixed delays (old behaviour)')
+    
+    args = parser.parse_args()
+    unknown = [field for field in args.require.split(',') if field.strip() and field.strip() not in CSV_FIELDS]
+    if unknown:
+        parser.error(f"--require: unknown fields {', '.join(unknown)} (choose from {', '.join(CSV_FIELDS)})")
+    output_format = export_format(args.output)
+    if output_format == 'parquet' and pyarrow is None:
+        parser.error("--output: Parquet needs pyarrow (pip install pyarrow)")
+    
+    # Read queries
+    with open(args.queries, 'r', encoding='utf-8') as f:
+        queries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    
+    print("="*60)
     print("🚀 GOOGLE MAPS SCRAPER - UNLIMITED VERSION")
     print("="*60)
     print(f"📋 Queries: {len(queries)}")
     print(f"📊 Max per query: {args.max}")
+    print(f"🖱️  Mode: {args.mode}{f' (click when missing {args.require})' if args.mode == 'hybrid' else ''}")
     print(f"📧 Extract contacts: {not args.no_contacts}")
+    print(f"🗂️  Maps tabs: {f'{args.min_tabs}-' if args.adaptive else ''}{args.tabs}"
+          f"{' (adaptive)' if args.adaptive else ''}{f' x {args.processes} processes' if args.processes > 1 else ''}")
+    if not args.no_contacts:
+        print(f"🌐 Contact engine: {args.contact_engine} ({args.contact_timeout:.0f}s per website)")
     print("="*60)
     
+    journal_path = args.journal or f"{os.path.splitext(args.output)[0]}.journal.jsonl"
+    print(f"📓 Journal: {journal_path}{' (resuming)' if args.resume else ''}")
+    
+    options = dict(
+        max_results_per_query=args.max,
+        extract_contacts=not args.no_contacts,
+        maps_tabs=args.tabs,
+        contact_workers=args.contact_workers,
+        contact_timeout=args.contact_timeout,
+        wait_mode=args.wait_mode,
+        contact_engine=args.contact_engine,
+        http_workers=args.http_workers,
+        block_resources=not args.no_block,
+        resource_rules=[f'allow:{r}' for r in args.allow_resource] + [f'deny:{r}' for r in args.block_resource],
+        cache_dir=None if args.no_cache else args.cache_dir,
+        cache_ttl_days=args.cache_ttl,
+        refresh_contacts=args.refresh_contacts,
+        dedupe=not args.no_dedupe,
+        resume=args.resume,
+        metrics_json=args.metrics_json or f"{os.path.splitext(args.output)[0]}.metrics.json",
+        metrics_prom=args.metrics_prom or f"{os.path.splitext(args.output)[0]}.metrics.prom",
+        metrics_interval=args.metrics_interval,
+        mode=args.mode,
+        require_fields=[field.strip() for field in args.require.split(',') if field.strip()],
+        recycle_after=args.recycle_after,
+        recycle_heap_mb=args.recycle_heap_mb,
+        adaptive=args.adaptive,
+        min_maps_tabs=args.min_tabs,
+        min_contact_workers=args.min_contact_workers,
+    )
+    stats_path = args.stats_json or f"{os.path.splitext(args.output)[0]}.stats.json"
+    
+    store_path = args.store or (None if output_format == 'csv' else f"{os.path.splitext(args.output)[0]}.sqlite3")
+    store = ResultStore(store_path, dedupe=not args.no_dedupe) if store_path else None
+    if store is not None:
+        print(f"🗄️  Store: {store_path} ({store.total} businesses already in it)")
+    
     # Run scraper
     start_time = time.time()
-    results = asyncio.run(scrape_all(queries, args.max, not args.no_contacts))
+    if args.processes > 1:
+        writer = scrape_sharded(queries, args.output, args.processes, options, journal_path, store)
+    else:
+        # Rows are written as each business is finished, so the output never
+        # has to be built from one big list
+        writer = store or ResultWriter(args.output)
+        try:
+            asyncio.run(scrape_all(queries, journal_path=journal_path, writer=writer, **options))
+        finally:
+            if store is None:
+                writer.close()
+            else:
+                store.commit()
+    
+    if store is not None:
+        # Everything in the store, including earlier runs
+        store.export(output_format, args.output)
     
-    # Save
-    save_to_csv(results, args.output)
+    print(f"\n💾 Saved to: {args.output}")
+    writer.save_stats(stats_path)
+    writer.print_stats()
+    print(f"📈 Statistics: {stats_path}")
+    if store is not None:
+        store.close()
     
     # Time
     elapsed = time.time() - start_time
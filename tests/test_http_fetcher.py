@@ -0,0 +1,66 @@
+"""
+HttpFetcher against a local aiohttp server
+
+    python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gmaps_scraper import MAX_HTML_BYTES, HttpFetcher, scan_contacts
+
+CHUNK = 16 * 1024
+
+def homepage(size):
+    """An HTML page of about size bytes with the email in its footer"""
+
+    footer = '<footer>Contact us: hello@example.com</footer></body></html>'
+    filler = '<p>' + 'x' * 96 + '</p>\n'
+    body = '<html><body>' + filler * ((size - len(footer)) // len(filler))
+    return (body + footer).encode()
+
+async def fetch_streamed(page):
+    """Serve page in CHUNK-sized writes and fetch it with HttpFetcher"""
+
+    async def handler(request):
+        response = web.StreamResponse(headers={'Content-Type': 'text/html; charset=utf-8'})
+        await response.prepare(request)
+        for start in range(0, len(page), CHUNK):
+            await response.write(page[start:start + CHUNK])
+            await asyncio.sleep(0.01)
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_get('/', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    session = HttpFetcher.create_session(2)
+    try:
+        return await HttpFetcher(session).fetch(f'http://127.0.0.1:{port}/', 10000)
+    finally:
+        await session.close()
+        await runner.cleanup()
+
+def test_reads_whole_body_across_chunks():
+    page = homepage(200 * 1024)
+    fetched = asyncio.run(fetch_streamed(page))
+    assert fetched.status == 200
+    assert len(fetched.html) == len(page)
+    assert 'hello@example.com' in scan_contacts(fetched.html).emails
+
+def test_caps_body_at_max_html_bytes():
+    page = homepage(MAX_HTML_BYTES + 3 * CHUNK)
+    fetched = asyncio.run(fetch_streamed(page))
+    assert len(fetched.html) == MAX_HTML_BYTES